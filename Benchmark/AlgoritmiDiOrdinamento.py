@@ -1,5 +1,10 @@
 import math
 import numpy as np
+
+## auxiliary arrays allocated by the algorithms, replaced by OperationCounting to count their accesses
+def NewArray(length, value=0):
+    return [value]*length
+
 ##----------------------------------------------------------------Inserion-------------------------------------------------------------------##
 
 def InsertionSort(A):
@@ -64,11 +69,116 @@ def QuickSort3Way(a, lo, hi):
     QuickSort3Way(a, lo, lt)
     QuickSort3Way(a, gt, hi)
 
+##------------------------------------------------------------Iterative QuickSort (introsort)------------------------------------------------------------##
+
+## explicit stack instead of recursion: the smaller side is processed first and the larger one is pushed,
+## so the stack never holds more than log2(n) ranges; when the partition depth exceeds 2*log2(n)
+## the range is completed with HeapSort, small ranges are completed with InsertionSort
+
+INSERTION_SORT_CUTOFF = 16
+NINTHER_THRESHOLD = 128
+
+def InsertionSortRange(A, p, q):
+    for i in range(p+1, q+1):
+        key = A[i]
+        j = i-1
+        while(j >= p and A[j] > key):
+            A[j+1] = A[j]
+            j = j - 1
+        A[j+1] = key
+
+def SiftDown(A, offset, i, n):
+    while True:
+        child = 2*i + 1
+        if child >= n:
+            return
+        if child + 1 < n and A[offset+child+1] > A[offset+child]:
+            child = child + 1
+        if A[offset+i] >= A[offset+child]:
+            return
+        swap(A, offset+i, offset+child)
+        i = child
+
+def HeapSortRange(A, p, q):
+    n = q - p + 1
+    for i in range(n//2 - 1, -1, -1):
+        SiftDown(A, p, i, n)
+    for end in range(n-1, 0, -1):
+        swap(A, p, p+end)
+        SiftDown(A, p, 0, end)
+
+def MedianOfThree(A, i, j, k):
+    if A[i] < A[j]:
+        if A[j] < A[k]:
+            return j
+        return k if A[i] < A[k] else i
+    if A[i] < A[k]:
+        return i
+    return k if A[j] < A[k] else j
+
+# median of three on small ranges, Tukey's ninther on large ones
+def SelectPivot(A, p, q):
+    mid = (p + q)//2
+    if q - p + 1 > NINTHER_THRESHOLD:
+        step = (q - p + 1)//8
+        return MedianOfThree(A,
+                             MedianOfThree(A, p, p+step, p+2*step),
+                             MedianOfThree(A, mid-step, mid, mid+step),
+                             MedianOfThree(A, q-2*step, q-step, q))
+    return MedianOfThree(A, p, mid, q)
+
+# same arguments of QuickSort: [p, q] inclusive
+def QuickSortIterative(A, p, q):
+    stack = [(p, q, 2*max(q-p+1, 1).bit_length())]
+    while stack:
+        p, q, depth = stack.pop()
+        while q - p + 1 > INSERTION_SORT_CUTOFF and depth > 0:
+            depth = depth - 1
+            swap(A, SelectPivot(A, p, q), q)
+            r = PartitionSlow(A, p, q)
+            if r - p < q - r:
+                stack.append((r+1, q, depth))
+                q = r - 1
+            else:
+                stack.append((p, r-1, depth))
+                p = r + 1
+
+        if q - p + 1 > INSERTION_SORT_CUTOFF:
+            HeapSortRange(A, p, q)
+        else:
+            InsertionSortRange(A, p, q)
+
+# same arguments of QuickSort3Way: [lo, hi)
+def QuickSort3WayIterative(a, lo, hi):
+    stack = [(lo, hi, 2*max(hi-lo, 1).bit_length())]
+    while stack:
+        lo, hi, depth = stack.pop()
+        while hi - lo > INSERTION_SORT_CUTOFF and depth > 0:
+            depth = depth - 1
+            swap(a, SelectPivot(a, lo, hi-1), hi-1)
+            lt, gt = partition3way(a, lo, hi)
+            if lt - lo < hi - gt:
+                stack.append((gt, hi, depth))
+                hi = lt
+            else:
+                stack.append((lo, lt, depth))
+                lo = gt
+
+        if hi - lo > INSERTION_SORT_CUTOFF:
+            HeapSortRange(a, lo, hi-1)
+        else:
+            InsertionSortRange(a, lo, hi-1)
+
 ##------------------------------------------------------------------------CountingSort--------------------------------------------------------------##
 
-def CountingSort(A, B, k):
+## negative numbers: offset is the lowest number of A, the k counters cover [offset, offset + k)
+def CountingSort(A, B, k, offset=0):
 
-    c = [0]*(k)
+    if offset != 0:
+        CountingSortOffset(A, B, k, offset)
+        return
+
+    c = NewArray(k)
 
     assert len(c) == k
 
@@ -83,6 +193,24 @@ def CountingSort(A, B, k):
     for i in range(len(A)-1, -1, -1):
         B[c[A[i]]-1] = A[i]
         c[A[i]] = c[A[i]]-1
+
+def CountingSortOffset(A, B, k, offset):
+
+    c = NewArray(k)
+
+    assert len(c) == k
+
+    for i in range(0, len(A)):
+        assert A[i] < k + offset
+        c[int(A[i]) - offset] = c[int(A[i]) - offset]+1
+
+
+    for j in range(1, k):
+        c[j] = c[j] + c[j-1]
+
+    for i in range(len(A)-1, -1, -1):
+        B[c[int(A[i]) - offset]-1] = A[i]
+        c[int(A[i]) - offset] = c[int(A[i]) - offset]-1
     
 #-------------------------------------------------RadixSort-------------------------------------------------------------------------------------------#
 
@@ -100,7 +228,7 @@ def get_max_digit(array):
 
 def CountingSort2(A, B, k, d):
 
-    c = [0]*(k)
+    c = NewArray(k)
 
     for i in range(0, len(A)):
         c[get_digit(A[i], d)] = c[get_digit(A[i], d)]+1
@@ -118,28 +246,130 @@ def CountingSort2(A, B, k, d):
         c[get_digit(A[i], d)] = c[get_digit(A[i], d)]-1
     
 
-## NOT WORKING WITH NEGATIVE NUMBERS
-def RadixSort(A, d):
-    B = [0]*len(A)
+## negative numbers: offset is the lowest number of A, the digits are the ones of A - offset
+def RadixSort(A, d, offset=0):
+    if offset != 0:
+        shifted = NewArray(len(A))
+        for i in range(0, len(A)):
+            shifted[i] = int(A[i]) - offset
+        A = shifted
+
+    B = NewArray(len(A))
     for i in range(0, d):
         #print("Analysing digits: ", i)
         CountingSort2(A, B, 10, i)
         A = B[:]
 
+    if offset != 0:
+        for i in range(0, len(A)):
+            A[i] = A[i] + offset
     return A
 
+#-------------------------------------------------Vectorized CountingSort / RadixSort--------------------------------------------------------------#
+
+## numpy counterparts of CountingSort and RadixSort: same algorithms, element loops replaced by array operations
+
+def CountingSortVectorized(A, B, k, offset=0):
+
+    # counters indexed by A - offset (unsigned 64 bit numbers are not accepted by bincount as they are)
+    keys = np.asarray(A)
+    if offset != 0 or not np.can_cast(keys.dtype, np.intp):
+        keys = keys.astype(np.intp) - offset
+    c = np.bincount(keys, minlength=k)
+
+    assert len(c) == k
+
+    B[:] = np.repeat(np.arange(offset, offset + k, dtype=B.dtype), c)
+
+
+def CountingSortDigitVectorized(A, B, shift, base):
+
+    # keys are non-negative, so the mask can be clipped to the dtype range without losing bits
+    digits = ((A >> shift) & min(base - 1, np.iinfo(A.dtype).max)).astype(np.uint8 if base <= 2**8 else np.uint16)
+    c = np.bincount(digits, minlength=base)
+
+    # all the elements share the same digit: the pass would not move anything
+    if c.max() == len(A):
+        B[:] = A
+        return
+
+    # stable ordering by digit (numpy uses a linear radix sort for 8 and 16 bit keys), gathered straight into B
+    np.take(A, np.argsort(digits, kind="stable"), out=B)
+
+
+## order preserving map of signed integers and floats to unsigned integers of the same width, offset by the lowest key:
+## the sign bit of integers is flipped, negative floats have all their bits flipped and positive ones only the sign bit
+def RadixSortKeys(A):
+    width = 8 * A.dtype.itemsize
+    keys = A.view(np.dtype(f"u{A.dtype.itemsize}"))
+    sign = keys.dtype.type(1 << (width - 1))
+
+    if A.dtype.kind == "f":
+        keys = keys ^ (np.negative(keys >> (width - 1)) | sign)
+    else:
+        keys = keys ^ sign
+
+    offset = keys.min()
+    return keys - offset, offset
+
+def RadixSortKeysInverse(keys, offset, dtype):
+    width = 8 * keys.dtype.itemsize
+    sign = keys.dtype.type(1 << (width - 1))
+
+    keys = keys + offset
+    if np.dtype(dtype).kind == "f":
+        keys = keys ^ (((keys >> (width - 1)) - keys.dtype.type(1)) | sign)
+    else:
+        keys = keys ^ sign
+    return keys.view(dtype)
+
+
+## base must be a power of two not greater than 2**16, negative integers and floats are sorted through RadixSortKeys
+## numpy arrays are sorted in place (other sequences are copied), the sorted array is also returned
+def RadixSortVectorized(A, base=256):
+    assert base >= 2 and base & (base - 1) == 0 and base <= 2**16, f"Base must be a power of two in [2, 2**16], got {base}"
+
+    array = A = np.asarray(A)
+    if len(A) == 0:
+        return array
+
+    dtype = A.dtype
+    transformed = dtype.kind == "f" or (dtype.kind == "i" and A.min() < 0)
+    if transformed:
+        A, offset = RadixSortKeys(A)
+
+    bits = base.bit_length() - 1
+    d = -(-int(A.max()).bit_length() // bits)
+
+    B = np.empty_like(A)
+    for i in range(0, d):
+        CountingSortDigitVectorized(A, B, i * bits, base)
+        A, B = B, A
+
+    if transformed:
+        array[:] = RadixSortKeysInverse(A, offset, dtype)
+    elif A is not array:
+        array[:] = A
+    return array
+
 #-------------------------------------------------BucketSort-------------------------------------------------------------------------------------------#
 
+## any range of numbers: the buckets split [min(A), max(A)] in len(A) intervals of the same width
 def bucketSort(A):
+    if len(A) == 0:
+        return
+    low = float(min(A))
+    width = (float(max(A)) - low) / len(A) or 1
+
     B = []
     for i in range(len(A)+1):
         B.append([])
 
     for i in range(len(A)):
-        B[math.floor(A[i]*len(A))].append(A[i])
+        B[min(math.floor((float(A[i]) - low) / width), len(A)-1)].append(A[i])
     
     for i in range(len(A)):
-        insertionSort(B[i])
+        InsertionSort(B[i])
 
     currentIndex = 0
     for i in range(len(A)):
@@ -0,0 +1,313 @@
+import AlgoritmiDiOrdinamento
+import SortingMeasurement
+import RunJournal
+import OperationCounting
+import os
+import numpy as np
+
+from Utils import ArrayDataManager
+from Utils import ArraySettings
+from Utils import ArrayStorageCompressor
+from Utils import SortingSettings
+from Utils import TimerCalibration
+
+
+def iterate_storage_chunks(storage_folders: list[str] = None, get_all: bool = True, profile: ArraySettings.VariabilityProfile = None):
+    """
+    Loads the array chunk files of the storage folders one at a time.
+
+    Args:
+        storage_folders (list[str], optional): names of the storage folders, the most recent one if not specified.
+        get_all (bool, optional): if True and no folder is specified, iterates over every storage folder.
+        profile (VariabilityProfile, optional): variability of the storage folders, the module settings if not specified.
+
+    Yields:
+        tuple[str, ArraySampleContainer]: storage folder path and the content of one of its chunk files.
+    """
+
+    chunk_files_by_folder = profile.get_array_chunk_files(storage_folders, get_all= get_all) if profile \
+        else ArraySettings.GET_ARRAY_CHUNK_FILES_IN_STORAGE_FOLDER(storage_folders, get_all= get_all)
+    for folder_path, chunk_files in chunk_files_by_folder.items():
+        for chunk_file in chunk_files:
+            yield folder_path, ArrayDataManager.read_array_storage_file(chunk_file)
+
+
+def default_file_format(profile: ArraySettings.VariabilityProfile = None) -> str:
+    """
+    Returns the default format of the execution times files of `profile`: the columnar format for (n, m) grid sweeps,
+    that the notebook plots of a single variability cannot show, `SortingSettings.EXECUTION_TIMES_FORMAT` otherwise.
+    """
+
+    if profile is not None and profile.grid:
+        return SortingSettings.EXECUTION_TIMES_COLUMNAR_FORMAT
+    return SortingSettings.EXECUTION_TIMES_FORMAT
+
+
+def fit_power_laws(execution_time_storage: ArrayDataManager.ExecutionTimeDataStorage) -> dict:
+    """
+    Fits the cost model seconds = c * n^a * m^b of every algorithm of `execution_time_storage` over all its folders
+    (see `ColumnarExecutionTimeStorage.fit_power_law`).
+
+    Returns:
+        dict: {algorithm: {'coefficient', 'n_exponent', 'm_exponent', 'r_squared'}}.
+    """
+
+    columnar_storage = ArrayDataManager.ColumnarExecutionTimeStorage.from_execution_time_storage(execution_time_storage)
+    return {algorithm: columnar_storage.fit_power_law(algorithm) for algorithm in columnar_storage.keys()}
+
+
+def execution_times_file_path(destination_folder: str, algorithm: str, file_format: str = None) -> str:
+    """
+    Returns the path of the execution times file of `algorithm`: '<Algorithm>.time' or '<Algorithm>.npz'
+    for the columnar format (see `SortingSettings.EXECUTION_TIMES_FORMAT`).
+    """
+
+    columnar = (file_format or SortingSettings.EXECUTION_TIMES_FORMAT) == SortingSettings.EXECUTION_TIMES_COLUMNAR_FORMAT
+    return os.path.join(destination_folder, algorithm + (ArrayDataManager.COLUMNAR_EXTENSION if columnar else SortingSettings.EXECUTION_TIMES_FILE_EXTENSION))
+
+
+def load_execution_times(file_path: str) -> ArrayDataManager.ExecutionTimeDataStorage:
+    """
+    Loads an execution times file of either format ('.time' pickle or '.npz' columnar).
+    """
+
+    if file_path.endswith(ArrayDataManager.COLUMNAR_EXTENSION):
+        return ArrayDataManager.ColumnarExecutionTimeStorage.load(file_path).to_execution_time_storage()
+    return ArrayStorageCompressor.readFromFile(file_path)
+
+
+def save_execution_times(execution_time_storage: ArrayDataManager.ExecutionTimeDataStorage, destination_folder: str = None,
+                         profile: ArraySettings.VariabilityProfile = None, skip_existing_runs: bool = False,
+                         file_format: str = None):
+    """
+    Saves each algorithm of `execution_time_storage` in its own '<Algorithm>.time' file ('<Algorithm>.npz' in the
+    columnar format), merging with the content of the file when it already exists. Each file is replaced atomically.
+
+    Args:
+        execution_time_storage (ExecutionTimeDataStorage): execution times to be saved.
+        destination_folder (str, optional): folder of the '.time' files, the execution times folder of `profile`
+            (`SortingSettings.EXECUTION_TIMES_FOLDER` without profile) if not specified.
+        profile (VariabilityProfile, optional): variability of the execution times.
+        skip_existing_runs (bool, optional): runs already saved in the files are skipped instead of raising
+            an error, so that saving the same runs again is harmless.
+        file_format (str, optional): one of `SortingSettings.EXECUTION_TIMES_FORMATS`,
+            the default format of `profile` if not specified (see `default_file_format`).
+
+    Returns:
+        list[str]: paths of the written files.
+    """
+
+    destination_folder = destination_folder or (profile.execution_times_folder if profile else SortingSettings.EXECUTION_TIMES_FOLDER)
+    os.makedirs(destination_folder, exist_ok= True)
+
+    file_format = file_format or default_file_format(profile)
+    assert file_format in SortingSettings.EXECUTION_TIMES_FORMATS, f"Unknown execution times format {file_format}, expected one of {SortingSettings.EXECUTION_TIMES_FORMATS}"
+
+    written_files = []
+    for algorithm in execution_time_storage.keys():
+        destination_file_path = execution_times_file_path(destination_folder, algorithm, file_format)
+        data_to_save = ArrayDataManager.ExecutionTimeDataStorage({algorithm: execution_time_storage[algorithm]})
+        if os.path.exists(destination_file_path):
+            data_to_save = load_execution_times(destination_file_path)
+            data_to_save.merge({algorithm: execution_time_storage[algorithm]}, skip_existing_runs= skip_existing_runs)
+
+        if file_format == SortingSettings.EXECUTION_TIMES_COLUMNAR_FORMAT:
+            ArrayDataManager.ColumnarExecutionTimeStorage.from_execution_time_storage(data_to_save).save(destination_file_path)
+        else:
+            ArrayStorageCompressor.writeOnFile(data_to_save, destination_file_path)
+        written_files.append(destination_file_path)
+    return written_files
+
+
+def measure_storage_streaming(algorithms: list[callable],
+                              storage_folders: list[str] = None,
+                              destination_folder: str = None,
+                              minTime: float = None,
+                              fresh_input: bool = False,
+                              adaptive: bool = False,
+                              count_operations: bool = False,
+                              profile_memory: bool = False,
+                              profile: ArraySettings.VariabilityProfile = None,
+                              file_format: str = None):
+    """
+    Measures the algorithms over the storage folders one chunk file at a time: every chunk is loaded,
+    measured with all the algorithms and released before loading the next one, so the peak memory is bounded
+    by the largest chunk. The execution times of a folder are saved to the '.time' files once all its chunks
+    are measured, so each file is read and written once per folder instead of once per chunk.
+
+    Args:
+        algorithms (list[callable]): sorting algorithms of AlgoritmiDiOrdinamento to be measured.
+        storage_folders (list[str], optional): names of the storage folders, all of them if not specified.
+        destination_folder (str, optional): folder of the '.time' files, `SortingSettings.EXECUTION_TIMES_FOLDER` if not specified.
+        minTime (float, optional): minimum cumulative time to measure for each array.
+            If not specified, it is read from the host calibration profile via `TimerCalibration.get_min_time()`.
+        fresh_input (bool, optional): see `SortingMeasurement.measure_container_array`.
+        adaptive (bool, optional): repetitions chosen by `SortingMeasurement.measure_sample_adaptive`.
+        count_operations (bool, optional): also counts the operations of every array (see `OperationCounting`),
+            the algorithms that cannot be instrumented are measured without counts.
+        profile_memory (bool, optional): also measures the memory used by every array (see `SortingMeasurement.measure_memory`).
+        profile (VariabilityProfile, optional): variability of the storage and execution times folders, the module settings if not specified.
+        file_format (str, optional): format of the execution times files (see `save_execution_times`).
+
+    Yields:
+        tuple[str, ExecutionTimeDataStorage]: storage folder path and the execution times of the chunk just measured.
+    """
+
+    if minTime is None:
+        minTime = TimerCalibration.get_min_time()
+
+    if profile:
+        profile.apply_recursion_limit()
+
+    sorting_algorithm = SortingMeasurement.MeasurableTimeExecutionAlgorithm()
+
+    # execution times of the chunks of the current folder: {algorithm: [ArrayExecutionTime]}
+    folder_execution_times = {}
+    current_folder_path = None
+
+    def save_folder():
+        save_execution_times(
+            ArrayDataManager.ExecutionTimeDataStorage({algorithm: {current_folder_path: execution_times} for algorithm, execution_times in folder_execution_times.items()}),
+            destination_folder, profile, file_format= file_format
+        )
+
+    for folder_path, array_sample_container in iterate_storage_chunks(storage_folders, get_all= storage_folders is None, profile= profile):
+        # the chunks of a folder are consecutive: the previous folder is complete
+        if folder_path != current_folder_path:
+            if folder_execution_times:
+                save_folder()
+            folder_execution_times = {}
+            current_folder_path = folder_path
+
+        chunk_execution_times = ArrayDataManager.ExecutionTimeDataStorage()
+        for algorithm in SortingMeasurement.supported_algorithms(algorithms, array_sample_container):
+            sorting_algorithm.set(algorithm)
+            operation_counter = None
+            if count_operations and sorting_algorithm.get_name() not in OperationCounting.NOT_INSTRUMENTABLE_ALGORITHMS:
+                operation_counter = sorting_algorithm.count_operations
+            chunk_execution_times.update(
+                algorithm = sorting_algorithm.get_name(),
+                array_folder = folder_path,
+                execution_times = SortingMeasurement.measure_container_array(
+                    array_sample_container = array_sample_container,
+                    function = sorting_algorithm.execute,
+                    minTime = minTime,
+                    fresh_input = fresh_input,
+                    adaptive = adaptive,
+                    operation_counter = operation_counter,
+                    memory_profiler = sorting_algorithm.measure_memory if profile_memory else None
+                )
+            )
+
+        # Releases the chunk before loading the next one
+        del array_sample_container
+
+        for algorithm in chunk_execution_times.keys():
+            folder_execution_times.setdefault(algorithm, []).extend(chunk_execution_times.get_execution_times(algorithm, folder_path))
+        yield folder_path, chunk_execution_times
+
+    if folder_execution_times:
+        save_folder()
+
+
+def measure_storage_journaled(journal_path: str,
+                              algorithms: list[callable] = None,
+                              storage_folders: list[str] = None,
+                              destination_folder: str = None,
+                              minTime: float = None,
+                              fresh_input: bool = False,
+                              profile: ArraySettings.VariabilityProfile = None,
+                              file_format: str = None) -> ArrayDataManager.ExecutionTimeDataStorage:
+    """
+    Checkpointed measurement: every (algorithm, folder, variability, repetition) unit is appended to a run journal
+    as soon as it is measured, the '.time' files are updated only once the whole run is completed.
+    If the journal already exists the run is resumed: its algorithms, storage folders, minTime, fresh input mode
+    and variability profile are taken from the journal and the units already recorded are skipped.
+
+    Args:
+        journal_path (str): path of the run journal.
+        algorithms (list[callable], optional): sorting algorithms to be measured (ignored when resuming).
+        storage_folders (list[str], optional): names of the storage folders, all of them if not specified (ignored when resuming).
+        destination_folder (str, optional): folder of the '.time' files, `SortingSettings.EXECUTION_TIMES_FOLDER` if not specified.
+        minTime (float, optional): minimum cumulative time to measure for each array (ignored when resuming).
+        fresh_input (bool, optional): see `SortingMeasurement.measure_container_array` (ignored when resuming).
+        profile (VariabilityProfile, optional): variability of the storage and execution times folders (ignored when resuming).
+        file_format (str, optional): format of the execution times files (see `save_execution_times`).
+
+    Returns:
+        ExecutionTimeDataStorage: execution times of the whole run.
+    """
+
+    journal = RunJournal.RunJournal(journal_path)
+
+    if journal.exists():
+        header = journal.get_header()
+        algorithms = [getattr(AlgoritmiDiOrdinamento, algorithm_name) for algorithm_name in header["algorithms"]]
+        storage_folders, minTime, fresh_input = header["storage_folders"], header["minTime"], header["fresh_input"]
+        profile = ArraySettings.VariabilityProfile.from_code(header["variability"]) if header.get("variability") else None
+        if journal.is_completed():
+            print(f"Run journal {journal.path} is already completed.")
+            return journal.to_execution_time_storage()
+        print(f"Resuming run journal {journal.path}: {len(journal.get_completed_units())} unit(s) already measured.")
+    else:
+        assert algorithms, f"No algorithms selected for the new run journal {journal.path}"
+        if minTime is None:
+            minTime = TimerCalibration.get_min_time()
+        if storage_folders is None:
+            # folders are fixed now, so that a resumed run does not pick up storage folders created later
+            storage_folders = [os.path.basename(folder) for folder in (profile or ArraySettings.DEFAULT_PROFILE).get_array_storage_folder_path(get_all= True)]
+        journal.start([algorithm.__name__ for algorithm in algorithms], storage_folders, minTime, fresh_input, profile.code if profile else None)
+
+    if profile:
+        profile.apply_recursion_limit()
+
+    completed_units = journal.get_completed_units()
+    sorting_algorithm = SortingMeasurement.MeasurableTimeExecutionAlgorithm()
+    overhead = TimerCalibration.get_loop_overhead_correction()
+
+    for folder_path, array_sample_container in iterate_storage_chunks(storage_folders, get_all= False, profile= profile):
+        for algorithm in SortingMeasurement.supported_algorithms(algorithms, array_sample_container):
+            sorting_algorithm.set(algorithm)
+
+            for array_sample in array_sample_container.get_samples():
+                for repetition, data in enumerate(array_sample.get_sample()):
+                    unit = (sorting_algorithm.get_name(), folder_path, array_sample.get_variability(), repetition)
+                    if unit in completed_units:
+                        continue
+
+                    # Initial quick test to activate potential warm-up optimizations (once per algorithm)
+                    SortingMeasurement.warm_up(sorting_algorithm.execute, minTime)
+
+                    # private copy: the loaded arrays are never modified by in-place algorithms
+                    data = np.array(data)
+                    raw_execution_time = None
+                    if fresh_input:
+                        raw_execution_time, execution_time = SortingMeasurement.measure_fresh_input(sorting_algorithm.execute, minTime, data)
+                    else:
+                        execution_time = SortingMeasurement.measure(sorting_algorithm.execute, minTime, data, overhead= overhead)
+
+                    journal.record(*unit, array_sample.get_creation_arguments(), execution_time, raw_execution_time)
+
+        # Releases the chunk before loading the next one
+        del array_sample_container
+
+    execution_time_storage = journal.to_execution_time_storage()
+    # a crash after some of the files were saved leaves their runs in the files: saving them again skips them
+    save_execution_times(execution_time_storage, destination_folder, profile, skip_existing_runs= True, file_format= file_format)
+    journal.complete()
+    return execution_time_storage
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser("Resume a checkpointed benchmark run")
+    parser.add_argument("-r", "--resume", help="Path of the run journal to be resumed.", type=str, required=True)
+    parser.add_argument("-o", "--output", help="Folder of the '.time' files.", type=str, default= None)
+    parser.add_argument("--format", help="Format of the execution times files, columnar for grid sweeps and '.time' pickles otherwise if not specified.", type=str, choices= SortingSettings.EXECUTION_TIMES_FORMATS, default= None)
+    args = parser.parse_args()
+
+    journal_path = os.path.abspath(args.resume)
+    output = os.path.abspath(args.output) if args.output else None
+    # storage folder paths recorded in the journal are relative to the project root
+    os.chdir(SortingMeasurement.projectRoot)
+    measure_storage_journaled(journal_path, destination_folder= output, file_format= args.format)
@@ -0,0 +1,191 @@
+import os
+import sys
+import numpy as np
+
+import AlgoritmiDiOrdinamento
+
+## counted operations, in the order they are reported
+OPERATIONS = ["comparisons", "reads", "writes", "moves", "auxiliary_elements", "max_recursion_depth"]
+
+## numpy algorithms work on whole arrays: their element operations happen in compiled code and cannot be counted
+NOT_INSTRUMENTABLE_ALGORITHMS = [
+    AlgoritmiDiOrdinamento.CountingSortVectorized.__name__,
+    AlgoritmiDiOrdinamento.RadixSortVectorized.__name__
+]
+
+ALGORITHMS_FILE = os.path.normcase(os.path.abspath(AlgoritmiDiOrdinamento.__file__))
+
+
+class OperationCounter:
+    """
+    Machine independent cost of a single execution of a sorting algorithm:
+        comparisons: comparisons between array elements,
+        reads / writes: element accesses of the input array and of the auxiliary arrays of the algorithm,
+        moves: writes of an array element (a swap is two moves),
+        auxiliary_elements: elements of the auxiliary arrays received, copied or allocated (AlgoritmiDiOrdinamento.NewArray)
+            by the algorithm (the memory used by the algorithms is measured by the memory profiling mode),
+        max_recursion_depth: maximum number of nested calls of the same function of AlgoritmiDiOrdinamento.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.counts = {operation: 0 for operation in OPERATIONS}
+
+    def add(self, operation, amount=1):
+        if self.enabled:
+            self.counts[operation] += amount
+
+    def to_dict(self):
+        return dict(self.counts)
+
+
+class CountedValue:
+    """
+    Array element whose comparisons are counted, arithmetic returns plain values.
+    """
+    __slots__ = ("value", "counter")
+
+    def __init__(self, value, counter):
+        self.value = value
+        self.counter = counter
+
+    def _compare(self, other, comparison):
+        self.counter.add("comparisons")
+        return comparison(self.value, other.value if isinstance(other, CountedValue) else other)
+
+    def __lt__(self, other): return self._compare(other, lambda a, b: a < b)
+    def __le__(self, other): return self._compare(other, lambda a, b: a <= b)
+    def __gt__(self, other): return self._compare(other, lambda a, b: a > b)
+    def __ge__(self, other): return self._compare(other, lambda a, b: a >= b)
+    def __eq__(self, other): return self._compare(other, lambda a, b: a == b)
+    def __ne__(self, other): return self._compare(other, lambda a, b: a != b)
+
+    def __hash__(self): return hash(self.value)
+    def __index__(self): return self.value.__index__()
+    def __int__(self): return int(self.value)
+    def __float__(self): return float(self.value)
+    def __repr__(self): return repr(self.value)
+
+    @staticmethod
+    def _unwrap(other):
+        return other.value if isinstance(other, CountedValue) else other
+
+    def __add__(self, other): return self.value + CountedValue._unwrap(other)
+    def __radd__(self, other): return CountedValue._unwrap(other) + self.value
+    def __sub__(self, other): return self.value - CountedValue._unwrap(other)
+    def __rsub__(self, other): return CountedValue._unwrap(other) - self.value
+    def __mul__(self, other): return self.value * CountedValue._unwrap(other)
+    def __rmul__(self, other): return CountedValue._unwrap(other) * self.value
+    def __floordiv__(self, other): return self.value // CountedValue._unwrap(other)
+    def __truediv__(self, other): return self.value / CountedValue._unwrap(other)
+    def __mod__(self, other): return self.value % CountedValue._unwrap(other)
+    def __rshift__(self, other): return self.value >> CountedValue._unwrap(other)
+    def __and__(self, other): return self.value & CountedValue._unwrap(other)
+    def __neg__(self): return -self.value
+
+
+class CountingArray:
+    """
+    List of CountedValue whose element reads and writes are counted.
+    """
+
+    def __init__(self, values, counter):
+        self.counter = counter
+        self.values = [value if isinstance(value, CountedValue) else CountedValue(value, counter) for value in values]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # a copy of the array is an auxiliary array
+            copy = CountingArray(self.values[index], self.counter)
+            self.counter.add("reads", len(copy))
+            self.counter.add("auxiliary_elements", len(copy))
+            return copy
+        self.counter.add("reads")
+        return self.values[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            values = list(value)
+            self.counter.add("writes", len(values))
+            self.counter.add("moves", len(values))
+            self.values[index] = [v if isinstance(v, CountedValue) else CountedValue(v, self.counter) for v in values]
+            return
+        self.counter.add("writes")
+        if isinstance(value, CountedValue):
+            self.counter.add("moves")
+        else:
+            value = CountedValue(value, self.counter)
+        self.values[index] = value
+
+    def __iter__(self):
+        for value in self.values:
+            self.counter.add("reads")
+            yield value
+
+    def to_list(self):
+        return [value.value for value in self.values]
+
+
+def _recursion_profiler(counter):
+    depths = {}
+
+    def profiler(frame, event, arg):
+        code = frame.f_code
+        if event not in ("call", "return") or os.path.normcase(code.co_filename) != ALGORITHMS_FILE:
+            return
+        if event == "call":
+            depths[code] = depths.get(code, 0) + 1
+            if depths[code] > counter.counts["max_recursion_depth"]:
+                counter.counts["max_recursion_depth"] = depths[code]
+        else:
+            depths[code] -= 1
+
+    return profiler
+
+
+def count_operations(function, arguments_builder, array):
+    """
+    Executes `function` once on a copy of `array` with instrumented elements and arrays: the auxiliary arrays
+    the algorithm allocates with `AlgoritmiDiOrdinamento.NewArray` are instrumented too, the algorithms are not modified otherwise.
+
+    Args:
+        function (callable): sorting algorithm of AlgoritmiDiOrdinamento.
+        arguments_builder (callable): builds the arguments of `function` from the array (see SortingMeasurement.AlgorithmArguments).
+        array (array-like): array to be sorted, it is not modified.
+
+    Returns:
+        dict: counts of the executed operations, see OperationCounter.
+    """
+    if function.__name__ in NOT_INSTRUMENTABLE_ALGORITHMS:
+        raise ValueError(f"Operations of {function.__name__} cannot be counted: it works on whole numpy arrays.")
+
+    counter = OperationCounter()
+    instrumented_array = CountingArray(np.asarray(array).tolist(), counter)
+
+    # the work done to build the arguments (e.g. max(array) of CountingSort) is not part of the algorithm
+    counter.enabled = False
+    arguments = list(arguments_builder(instrumented_array))
+    for i, argument in enumerate(arguments):
+        if argument is not instrumented_array and isinstance(argument, (list, np.ndarray)):
+            arguments[i] = CountingArray(np.asarray(argument).tolist(), counter)
+            counter.counts["auxiliary_elements"] += len(argument)
+    counter.enabled = True
+
+    def new_counting_array(length, value=0):
+        counter.add("auxiliary_elements", length)
+        return CountingArray([value]*length, counter)
+
+    new_array = AlgoritmiDiOrdinamento.NewArray
+    AlgoritmiDiOrdinamento.NewArray = new_counting_array
+    previous_profiler = sys.getprofile()
+    sys.setprofile(_recursion_profiler(counter))
+    try:
+        function(*arguments)
+    finally:
+        sys.setprofile(previous_profiler)
+        AlgoritmiDiOrdinamento.NewArray = new_array
+
+    return counter.to_dict()
@@ -0,0 +1,233 @@
+import AlgoritmiDiOrdinamento
+import SortingMeasurement
+import os
+import sys
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+from Utils import ArrayDataManager
+from Utils import ArraySettings
+from Utils import TimerCalibration
+
+# byte alignment of every array inside the shared memory block
+SHARED_ARRAY_ALIGNMENT = 64
+
+# worker process state, set by _initialize_worker
+_worker_state = {}
+
+
+def share_folders_data(folders_data_storage: ArrayDataManager.FoldersDataStorage):
+    """
+    Copies every array of a FoldersDataStorage into a single shared memory block, so that
+    worker processes can read them without pickling.
+
+    Args:
+        folders_data_storage (FoldersDataStorage): arrays grouped by storage folder.
+
+    Returns:
+        tuple[SharedMemory, dict]: the shared memory block (owned by the caller, which must close and unlink it)
+            and the index {(folder, variability key): [(offset, length, dtype), ...]} with one entry per repetition.
+    """
+
+    index = {}
+    total_bytes = 0
+    for folder_path, array_sample_container in folders_data_storage.items():
+        for key, array_sample in array_sample_container.items():
+            entries = []
+            for data in array_sample.get_sample():
+                data = np.asarray(data)
+                entries.append((total_bytes, len(data), data.dtype.str))
+                total_bytes += -(-data.nbytes // SHARED_ARRAY_ALIGNMENT) * SHARED_ARRAY_ALIGNMENT
+            index[(folder_path, key)] = entries
+
+    shm = shared_memory.SharedMemory(create=True, size=max(total_bytes, 1))
+    for folder_path, array_sample_container in folders_data_storage.items():
+        for key, array_sample in array_sample_container.items():
+            for data, (offset, length, dtype) in zip(array_sample.get_sample(), index[(folder_path, key)]):
+                np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset)[:] = data
+
+    return shm, index
+
+
+def pinning_supported() -> bool:
+    """
+    Returns whether the current platform can bind a process to a CPU (not on macOS).
+    """
+    if hasattr(os, "sched_setaffinity"):
+        return True
+    try:
+        import psutil
+    except ImportError:
+        return False
+    return hasattr(psutil.Process, "cpu_affinity")
+
+
+def pin_current_process(cpu: int):
+    """
+    Binds the calling process to a single CPU.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+    else:
+        import psutil
+        psutil.Process().cpu_affinity([cpu])
+
+
+def available_cpus() -> list[int]:
+    """
+    Returns the CPUs the current process is allowed to run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _initialize_worker(shm_name, index, minTime, fresh_input, cpus, worker_counter, recursion_limit=None, overhead=0.0):
+    if recursion_limit and sys.getrecursionlimit() < recursion_limit:
+        sys.setrecursionlimit(recursion_limit)
+    if cpus:
+        with worker_counter.get_lock():
+            worker_number = worker_counter.value
+            worker_counter.value += 1
+        pin_current_process(cpus[worker_number % len(cpus)])
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_state.update(
+        shm = shm,
+        index = index,
+        minTime = minTime,
+        fresh_input = fresh_input,
+        overhead = overhead,
+        algorithms = {}
+    )
+
+
+def _get_worker_algorithm(algorithm_name):
+    algorithms = _worker_state["algorithms"]
+    if algorithm_name not in algorithms:
+        sorting_algorithm = SortingMeasurement.MeasurableTimeExecutionAlgorithm()
+        sorting_algorithm.set(getattr(AlgoritmiDiOrdinamento, algorithm_name))
+        # Initial quick test to activate potential warm-up optimizations (as measure_container_array does)
+        SortingMeasurement.warm_up(sorting_algorithm.execute, _worker_state["minTime"])
+        algorithms[algorithm_name] = sorting_algorithm
+    return algorithms[algorithm_name]
+
+
+def _measure_unit(unit):
+    algorithm_name, folder_path, key, repetition = unit
+    offset, length, dtype = _worker_state["index"][(folder_path, key)][repetition]
+
+    # private copy: the shared arrays are never modified by in-place algorithms
+    data = np.ndarray(length, dtype=dtype, buffer=_worker_state["shm"].buf, offset=offset).copy()
+    function = _get_worker_algorithm(algorithm_name).execute
+
+    if _worker_state["fresh_input"]:
+        raw_time, corrected_time = SortingMeasurement.measure_fresh_input(function, _worker_state["minTime"], data)
+        return unit, corrected_time, raw_time
+    return unit, SortingMeasurement.measure(function, _worker_state["minTime"], data, overhead= _worker_state["overhead"]), None
+
+
+def measure_folders_parallel(folders_data_storage: ArrayDataManager.FoldersDataStorage,
+                             algorithms: list[callable],
+                             minTime: float = None,
+                             workers: int = None,
+                             pin_cpus: bool = False,
+                             fresh_input: bool = False,
+                             profile: ArraySettings.VariabilityProfile = None) -> ArrayDataManager.ExecutionTimeDataStorage:
+    """
+    Parallel counterpart of calling `measure_container_array` for every algorithm and every storage folder.
+    Each (algorithm, folder, variability key, repetition) is an independent work unit executed by a process pool;
+    arrays are shipped to the workers through shared memory.
+
+    Args:
+        folders_data_storage (FoldersDataStorage): arrays grouped by storage folder.
+        algorithms (list[callable]): sorting algorithms of AlgoritmiDiOrdinamento to be measured.
+        minTime (float, optional): minimum cumulative time to measure for each array.
+            If not specified, it is read from the host calibration profile via `TimerCalibration.get_min_time()`.
+        workers (int, optional): number of worker processes, defaults to the number of available CPUs.
+        pin_cpus (bool, optional): binds each worker to a different CPU, skipped with a warning where unsupported.
+        fresh_input (bool, optional): measures with `measure_fresh_input` (see `measure_container_array`).
+        profile (VariabilityProfile, optional): variability of the arrays, the workers recursion limit follows its longest array.
+
+    Returns:
+        ExecutionTimeDataStorage: execution times with the same structure of the serial measurement.
+    """
+
+    assert isinstance(folders_data_storage, ArrayDataManager.FoldersDataStorage), \
+        f"Expected FoldersDataStorage, got {type(folders_data_storage)}"
+
+    for algorithm in algorithms:
+        if algorithm.__name__ not in SortingMeasurement.AlgorithmArguments:
+            raise Exception(f"Unknown algorithm {algorithm.__name__}.\nAvailable algorithms: {list(SortingMeasurement.AlgorithmArguments.keys())}")
+
+    algorithms = SortingMeasurement.supported_algorithms(algorithms, *folders_data_storage.values())
+
+    if minTime is None:
+        minTime = TimerCalibration.get_min_time()
+    overhead = TimerCalibration.get_loop_overhead_correction()
+
+    cpus = available_cpus()
+    workers = workers or len(cpus)
+    if pin_cpus and not pinning_supported():
+        print("[Warning] CPU pinning is not supported on this platform, the workers are not pinned.")
+        pin_cpus = False
+
+    units = [
+        (algorithm.__name__, folder_path, key, repetition)
+        for algorithm in algorithms
+        for folder_path, array_sample_container in folders_data_storage.items()
+        for key, array_sample in array_sample_container.items()
+        for repetition in range(len(array_sample.get_sample()))
+    ]
+    # longest units first, so that the pool does not end waiting for a single large array
+    units.sort(key=lambda unit: -folders_data_storage.get_by_folder(unit[1]).get(unit[2]).get_creation_arguments().get_length())
+
+    shm, index = share_folders_data(folders_data_storage)
+    results = {}
+    try:
+        with ProcessPoolExecutor(
+            max_workers = workers,
+            initializer = _initialize_worker,
+            initargs = (shm.name, index, minTime, fresh_input, cpus if pin_cpus else None, multiprocessing.Value('i', 0), profile.recursion_limit if profile else None, overhead)
+        ) as executor:
+            futures = [executor.submit(_measure_unit, unit) for unit in units]
+            for future in as_completed(futures):
+                unit, execution_time, raw_execution_time = future.result()
+                results[unit] = (execution_time, raw_execution_time)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return collect_execution_times(folders_data_storage, algorithms, results, fresh_input)
+
+
+def collect_execution_times(folders_data_storage, algorithms, results, fresh_input= False):
+    """
+    Builds an ExecutionTimeDataStorage from the results of the single work units
+    {(algorithm name, folder, variability key, repetition): (execution time, raw execution time)},
+    following the same algorithm, folder and key order of the serial measurement.
+    """
+
+    execution_time_storage = ArrayDataManager.ExecutionTimeDataStorage()
+    for algorithm in algorithms:
+        for folder_path, array_sample_container in folders_data_storage.items():
+            array_execution_times = []
+            for key, array_sample in array_sample_container.items():
+                repetitions = range(len(array_sample.get_sample()))
+                unit_results = [results[(algorithm.__name__, folder_path, key, r)] for r in repetitions]
+                array_execution_times.append(
+                    ArrayDataManager.ArrayExecutionTime(
+                        variability = array_sample.get_variability(),
+                        execution_times = [execution_time for execution_time, _ in unit_results],
+                        creation_arguments = array_sample.get_creation_arguments(),
+                        raw_execution_times = [raw for _, raw in unit_results] if fresh_input else None
+                    )
+                )
+            execution_time_storage.update(
+                algorithm = algorithm.__name__,
+                array_folder = folder_path,
+                execution_times = array_execution_times
+            )
+    return execution_time_storage
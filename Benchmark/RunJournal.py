@@ -0,0 +1,148 @@
+import json
+import os
+
+from Utils import ArrayDataManager
+
+JOURNAL_EXTENSION = ".journal"
+
+
+class RunJournal:
+    """
+    Append-only journal of a benchmark run, stored as one json object per line.
+    The first line describes the run (algorithms, storage folders, minTime, fresh input mode), every following
+    line records a completed (algorithm, folder, variability, repetition) unit with its execution time,
+    the last line marks the run as completed. Each line is flushed to disk as soon as it is written,
+    so after a crash the run can be resumed skipping the units already measured.
+
+    Methods:
+        exists() -> bool: True if the journal file already exists.
+        start(algorithms, storage_folders, minTime, fresh_input, variability) -> None: creates the journal with its header.
+        get_header() -> dict: returns the run description.
+        record(algorithm, folder, variability, repetition, creation_arguments, execution_time, raw_execution_time) -> None:
+            appends a completed unit.
+        get_completed_units() -> dict: returns {(algorithm, folder, variability, repetition): unit record}.
+        is_completed() -> bool: True if the whole run was completed and saved.
+        complete() -> None: marks the run as completed.
+        to_execution_time_storage() -> ExecutionTimeDataStorage: rebuilds the execution times of the recorded units.
+    """
+
+    def __init__(self, path):
+        self.path = path if path.endswith(JOURNAL_EXTENSION) else path + JOURNAL_EXTENSION
+        self.header = None
+        self.units = {}
+        self.completed = False
+        self.valid_size = None
+        if self.exists():
+            self._read()
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def _read(self):
+        with open(self.path, "rb") as file:
+            content = file.read()
+        lines = content.split(b"\n")
+        if lines[-1] == b"":
+            lines.pop()
+
+        # byte offset of the end of the last complete line, the next entries are appended from there
+        self.valid_size = 0
+        for line_number, line in enumerate(lines):
+            try:
+                entry = json.loads(line.decode("utf-8"))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # a crash can truncate only the last line
+                if line_number == len(lines) - 1:
+                    break
+                raise ValueError(f"Corrupted journal {self.path} at line {line_number + 1}.")
+            self.valid_size += len(line) + 1
+
+            if entry["type"] == "header":
+                self.header = entry
+            elif entry["type"] == "unit":
+                # (n, m) grid keys are read back from json lists
+                entry["variability"] = ArrayDataManager.parse_variability_key(entry["variability"])
+                self.units[(entry["algorithm"], entry["folder"], entry["variability"], entry["repetition"])] = entry
+            elif entry["type"] == "completed":
+                self.completed = True
+
+        assert self.header is not None, f"No header found in journal {self.path}"
+
+    def _append(self, entry):
+        with open(self.path, "r+b" if self.exists() else "wb") as file:
+            if self.valid_size is not None:
+                # drops the partial line left by a crash (or completes a last line written without its newline)
+                file.truncate(min(self.valid_size, os.fstat(file.fileno()).st_size))
+                file.seek(0, os.SEEK_END)
+                if file.tell() < self.valid_size:
+                    file.write(b"\n")
+                self.valid_size = None
+            file.seek(0, os.SEEK_END)
+            file.write((json.dumps(entry) + "\n").encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def start(self, algorithms, storage_folders, minTime, fresh_input=False, variability=None):
+        if self.exists():
+            raise FileExistsError(f"Journal {self.path} already exists, resume it instead.")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok= True)
+        self.header = {
+            "type": "header",
+            "algorithms": list(algorithms),
+            "storage_folders": storage_folders,
+            "minTime": minTime,
+            "fresh_input": fresh_input,
+            # code of the ArraySettings.VariabilityProfile of the run, None for the module settings
+            "variability": variability
+        }
+        self._append(self.header)
+
+    def get_header(self):
+        return self.header
+
+    def record(self, algorithm, folder, variability, repetition, creation_arguments, execution_time, raw_execution_time=None):
+        entry = {
+            "type": "unit",
+            "algorithm": algorithm,
+            "folder": folder,
+            "variability": variability,
+            "repetition": repetition,
+            "creation_arguments": creation_arguments.to_dict(as_json=True),
+            "execution_time": execution_time,
+            "raw_execution_time": raw_execution_time
+        }
+        self._append(entry)
+        self.units[(algorithm, folder, variability, repetition)] = entry
+
+    def get_completed_units(self):
+        return self.units
+
+    def is_completed(self):
+        return self.completed
+
+    def complete(self):
+        self._append({"type": "completed"})
+        self.completed = True
+
+    def to_execution_time_storage(self):
+        grouped = {}
+        for (algorithm, folder, variability, repetition), entry in self.units.items():
+            grouped.setdefault(algorithm, {}).setdefault(folder, {}).setdefault(variability, []).append(entry)
+
+        execution_time_storage = ArrayDataManager.ExecutionTimeDataStorage()
+        for algorithm, folders in grouped.items():
+            for folder, variabilities in folders.items():
+                array_execution_times = []
+                for variability in sorted(variabilities):
+                    entries = sorted(variabilities[variability], key=lambda entry: entry["repetition"])
+                    raw_execution_times = [entry["raw_execution_time"] for entry in entries]
+                    array_execution_times.append(
+                        ArrayDataManager.ArrayExecutionTime(
+                            variability = variability,
+                            execution_times = [entry["execution_time"] for entry in entries],
+                            creation_arguments = ArrayDataManager.ArraySampleCreationArguments(**entries[0]["creation_arguments"]),
+                            raw_execution_times = None if None in raw_execution_times else raw_execution_times
+                        )
+                    )
+                execution_time_storage.update(algorithm = algorithm, array_folder = folder, execution_times = array_execution_times)
+        return execution_time_storage
@@ -1,7 +1,8 @@
 import AlgoritmiDiOrdinamento
+import OperationCounting
 import time
+import tracemalloc
 import numpy as np
-import copy
 
 #### --- MAKING ROOT PROJECT FOLDER VISIBLE AT SCRIPT LEVEL ---
 
@@ -12,8 +13,9 @@ import copy
 import os, sys
 projectRoot = ""    
 
+# the current folder is checked first (e.g. 'python -m Benchmark.run' launched from the project root)
 for folderPathIndex in range(len(os.getcwd().split(os.sep))-1):
-    projectRoot = os.sep.join(os.getcwd().split(os.sep)[:-folderPathIndex-1])
+    projectRoot = os.sep.join(os.getcwd().split(os.sep)[:len(os.getcwd().split(os.sep))-folderPathIndex])
     if not os.path.exists(os.sep.join([projectRoot, "ROOT_BEACON"])):
         projectRoot = ""
     else:
@@ -31,17 +33,63 @@ if projectRoot not in sys.path:
 from Utils import ArraySettings
 from Utils import ArrayDataManager
 from Utils import SortingSettings
+from Utils import TimerCalibration
 sys.setrecursionlimit(ArraySettings.MAXIMUM_ARRAY_LENGTH+1)
 
+# memory metrics of a single execution, see measure_memory
+MEMORY_METRICS = ["peak_bytes", "allocated_bytes", "retained_bytes", "peak_rss_bytes"]
+
+# offset of the counting based algorithms: the lowest number of the array when negative, otherwise 0 (unsigned arrays are not scanned)
+def counting_offset(array):
+    if getattr(array, "dtype", None) is not None and array.dtype.kind == "u":
+        return 0
+    return min(int(np.min(array)), 0)
+
 # lambda dict to calculate arguments for each sorting algorithm 
 AlgorithmArguments = {
     AlgoritmiDiOrdinamento.InsertionSort.__name__: lambda array: (array, ),
     AlgoritmiDiOrdinamento.QuickSort.__name__: lambda array: (array, 0, len(array)-1),
     AlgoritmiDiOrdinamento.QuickSort3Way.__name__: lambda array: (array, 0, len(array)),
-    AlgoritmiDiOrdinamento.CountingSort.__name__: lambda array: (array, [0]*len(array), max(array)+1),
-    AlgoritmiDiOrdinamento.RadixSort.__name__: lambda array: (array, len(str(max(array)+1)))
+    AlgoritmiDiOrdinamento.QuickSortIterative.__name__: lambda array: (array, 0, len(array)-1),
+    AlgoritmiDiOrdinamento.QuickSort3WayIterative.__name__: lambda array: (array, 0, len(array)),
+    AlgoritmiDiOrdinamento.CountingSort.__name__: lambda array: (array, [0]*len(array), int(max(array)) - (offset := counting_offset(array)) + 1, offset),
+    AlgoritmiDiOrdinamento.RadixSort.__name__: lambda array: (array, len(str(int(max(array)) - (offset := counting_offset(array)) + 1)), offset),
+    AlgoritmiDiOrdinamento.CountingSortVectorized.__name__: lambda array: (array, np.empty_like(array), int(np.max(array)) - (offset := counting_offset(array)) + 1, offset),
+    AlgoritmiDiOrdinamento.RadixSortVectorized.__name__: lambda array: (array, SortingSettings.RADIX_SORT_VECTORIZED_BASE)
 }
 
+# algorithms indexing counters by the numbers of the array: floating point arrays cannot be sorted by them
+INTEGER_ONLY_ALGORITHMS = [
+    AlgoritmiDiOrdinamento.CountingSort.__name__,
+    AlgoritmiDiOrdinamento.RadixSort.__name__,
+    AlgoritmiDiOrdinamento.CountingSortVectorized.__name__
+]
+
+def supports_data_type(algorithm_name, dtype):
+    """
+    Returns whether the algorithm can sort arrays of the given dtype.
+    """
+    return np.dtype(dtype).kind != "f" or algorithm_name not in INTEGER_ONLY_ALGORITHMS
+
+def supported_algorithms(algorithms, *array_sample_containers):
+    """
+    Returns the algorithms able to sort every array of the containers (see `supports_data_type`),
+    the other ones are reported and skipped.
+    """
+    data_types = {
+        np.asarray(array_sample.get_sample()[0]).dtype
+        for array_sample_container in array_sample_containers
+        for array_sample in array_sample_container.get_samples()
+    }
+    supported = []
+    for algorithm in algorithms:
+        unsupported_data_types = [data_type.name for data_type in data_types if not supports_data_type(algorithm.__name__, data_type)]
+        if unsupported_data_types:
+            print(f"Skipping {algorithm.__name__}: arrays of type {', '.join(unsupported_data_types)} are not supported.")
+            continue
+        supported.append(algorithm)
+    return supported
+
 
 
 class MeasurableTimeExecutionAlgorithm:
@@ -67,6 +115,13 @@ class MeasurableTimeExecutionAlgorithm:
             Executes the selected function on the provided data.
             The actual arguments are dynamically retrieved via `AlgorithmArguments[function_name](array)`.
 
+        count_operations(array: Any) -> dict:
+            Executes the selected function once in the instrumented mode of `OperationCounting`
+            and returns the counts of its operations.
+
+        measure_memory(array: Any, subprocess: bool = False) -> dict:
+            Executes the selected function once (arguments included) and returns its memory usage, see `measure_memory`.
+
     Raises:
         Exception: if attempting to set a function not listed in `AlgorithmArguments`.
     """
@@ -93,6 +148,23 @@ class MeasurableTimeExecutionAlgorithm:
         # Gets the required arguments for the function based on its name, then executes it
         return self.function(*(AlgorithmArguments[self.get().__name__](array)))
 
+    def count_operations(self, array):
+        """
+        Executes the currently set function on an instrumented copy of the array, counting its operations.
+        The uninstrumented `execute` is not affected.
+        """
+        return OperationCounting.count_operations(self.function, AlgorithmArguments[self.get_name()], array)
+
+    def measure_memory(self, array, subprocess=False):
+        """
+        Measures the memory used by a single execution of the currently set function, including the arguments
+        built by AlgorithmArguments (e.g. the output array of CountingSort).
+        With `subprocess` the execution runs in a fresh process, which also reports the growth of its peak RSS.
+        """
+        if subprocess:
+            return measure_memory_subprocess(self.get_name(), array)
+        return measure_memory(self.execute, array)
+
     def get(self):
         """
         Returns the reference to the currently set function.
@@ -109,7 +181,7 @@ class MeasurableTimeExecutionAlgorithm:
 
 
     
-def measure(function: callable, minTime: float, *args) -> float:
+def measure(function: callable, minTime: float, *args, overhead: float = 0.0) -> float:
     """
     Measures the average execution time of the `function`, repeating it multiple times until
     the total time exceeds `minTime`.
@@ -118,6 +190,8 @@ def measure(function: callable, minTime: float, *args) -> float:
         function (callable): the function to be measured. It must accept the arguments provided in `args`.
         minTime (float): minimum cumulative time (in seconds) to reach before calculating the average.
         *args: positional arguments to be passed to the function in each call.
+        overhead (float, optional): cost of one iteration of the loop itself, subtracted from the average
+            (see `TimerCalibration.get_loop_overhead_correction`).
 
     Returns:
         float: average time (in seconds) for a single execution of the function on `args`.
@@ -136,12 +210,248 @@ def measure(function: callable, minTime: float, *args) -> float:
             break
 
     # Calculate average time by dividing total time by the number of executions
-    return (end_time - start_time) / count
+    return max((end_time - start_time) / count - overhead, 0.0)
+
+
+# algorithms already warmed up by the current process, see warm_up
+_warmed_up_algorithms = set()
+
+def warm_up(function: callable, minTime: float) -> None:
+    """
+    Initial quick test to activate potential warm-up optimizations, executed once for each algorithm by the current process.
+
+    Args:
+        function (callable): the function to be measured (e.g. `MeasurableTimeExecutionAlgorithm.execute`,
+            identified by the name of its algorithm).
+        minTime (float): minimum cumulative time of the test (see `measure`).
+    """
+    algorithm = getattr(function, "__self__", None)
+    key = algorithm.get_name() if isinstance(algorithm, MeasurableTimeExecutionAlgorithm) else function
+    if key not in _warmed_up_algorithms:
+        measure(function, minTime, [i for i in range(100)])
+        _warmed_up_algorithms.add(key)
+
+
+def measure_fresh_input(function: callable, minTime: float, array,
+                        pool_size: int = SortingSettings.FRESH_INPUT_POOL_SIZE) -> tuple[float, float]:
+    """
+    Measures the average execution time of the `function` like `measure`, but every execution
+    receives an untouched copy of `array`, so in-place algorithms never time an already sorted input.
+
+    The copies are taken from a preallocated pool of buffers that is refilled with a single bulk
+    `np.copyto` outside the timed region; only the calls of `function` are timed. Each pass runs twice
+    the buffers of the previous one (from a single buffer up to the whole pool), so slow functions stop
+    after the first executions reaching `minTime` and only the buffers of the pass are refilled.
+
+    Args:
+        function (callable): the function to be measured. It must accept a single array argument.
+        minTime (float): minimum cumulative time (in seconds) spent in `function` before calculating the average.
+        array (array-like): input array, never modified.
+        pool_size (int, optional): maximum number of buffers in the pool, further bounded by
+            `SortingSettings.FRESH_INPUT_POOL_MAX_BYTES`.
+
+    Returns:
+        tuple[float, float]: (raw, corrected) average time (in seconds) for a single execution,
+            where `raw` includes the refill copy overhead and `corrected` excludes it.
+    """
+
+    array = np.asarray(array)
+    pool_size = max(1, min(pool_size, SortingSettings.FRESH_INPUT_POOL_MAX_BYTES // max(array.nbytes, 1)))
+    pool = np.empty((pool_size,) + array.shape, dtype=array.dtype)
+
+    count = 0  # Counter for the number of executions performed
+    execution_time = 0.0  # Cumulative time spent in function
+    copy_time = 0.0  # Cumulative time spent refilling the pool
+
+    pass_size = 1  # Buffers used by the current pass
+
+    while execution_time < minTime:
+        buffers = pool[:pass_size]
+        copy_start_time = time.perf_counter()
+        np.copyto(buffers, array)  # Restores the buffers of the pass with the original data (broadcast)
+        start_time = time.perf_counter()
+
+        for buffer in buffers:
+            function(buffer)  # Executes the function on a fresh copy
 
+        end_time = time.perf_counter()
+        copy_time += start_time - copy_start_time
+        execution_time += end_time - start_time
+        count += pass_size
+        pass_size = min(2 * pass_size, pool_size)
 
-def measure_container_array(array_sample_container: ArrayDataManager.ArraySampleContainer, 
-                            function: callable, 
-                            minTime: float = None) -> list[ArrayDataManager.ArrayExecutionTime]:
+    return (execution_time + copy_time) / count, execution_time / count
+
+
+def measure_sample_adaptive(function: callable, minTime: float, arrays: list,
+                            fresh_input: bool = False,
+                            target_relative_ci: float = SortingSettings.ADAPTIVE_TARGET_RELATIVE_CI,
+                            min_repetitions: int = SortingSettings.ADAPTIVE_MIN_REPETITIONS,
+                            max_repetitions: int = SortingSettings.ADAPTIVE_MAX_REPETITIONS,
+                            overhead: float = 0.0) -> tuple[list[float], list[float]]:
+    """
+    Measures the repetitions of a single sample until the 95% confidence interval of the mean execution time
+    (half-width relative to the mean, as computed by `TimeAnalysis`) drops below `target_relative_ci`.
+    Every array is measured at least once: stable samples stop after `min_repetitions` (or after the last array),
+    noisy ones continue up to `max_repetitions`, cycling over the arrays. Every repetition runs on a private copy.
+
+    The repetitions of the same array are not independent, so the confidence interval is computed over the
+    mean time of each distinct array (over the repetitions themselves for single array samples), with the
+    Student's t quantile of so few values, and a time is returned for each array: further cycles only reduce
+    the measurement noise of each array.
+
+    Args:
+        function (callable): the function to be measured.
+        minTime (float): minimum cumulative time (in seconds) for each repetition (see `measure`).
+        arrays (list): arrays of the sample.
+        fresh_input (bool, optional): measures each repetition with `measure_fresh_input`.
+        target_relative_ci (float, optional): target relative half-width of the 95% confidence interval.
+        min_repetitions (int, optional): minimum number of repetitions.
+        max_repetitions (int, optional): maximum number of repetitions (raised to the number of arrays).
+        overhead (float, optional): loop overhead subtracted by `measure`.
+
+    Returns:
+        tuple[list[float], list[float]]: mean execution time and mean raw execution time (empty unless `fresh_input`)
+            of each array, in the order of `arrays`.
+    """
+
+    # repetitions measured on each array of the sample
+    array_times = [[] for _ in arrays]
+    raw_array_times = [[] for _ in arrays]
+    time_analysis = ArrayDataManager.TimeAnalysis()
+
+    for repetition in range(max(min_repetitions, max_repetitions, len(arrays))):
+        index = repetition % len(arrays)
+        data = np.array(arrays[index])
+        if fresh_input:
+            raw_time, corrected_time = measure_fresh_input(function, minTime, data)
+            array_times[index].append(corrected_time)
+            raw_array_times[index].append(raw_time)
+        else:
+            array_times[index].append(measure(function, minTime, data, overhead= overhead))
+
+        if len(arrays) == 1:
+            time_analysis.compute_analysis(array_times)
+        else:
+            time_analysis.compute_analysis([[np.mean(times) for times in array_times if times]])
+        if repetition + 1 >= max(min_repetitions, len(arrays), 2):
+            z = ArrayDataManager.student_t_975(time_analysis.count - 1)
+            if time_analysis.relative_confidence_interval(z) <= target_relative_ci:
+                break
+
+    time_repetitions = [float(np.mean(times)) for times in array_times]
+    raw_time_repetitions = [float(np.mean(times)) for times in raw_array_times] if fresh_input else []
+    return time_repetitions, raw_time_repetitions
+
+
+def peak_rss_bytes() -> int:
+    """
+    Returns the peak resident set size of the current process in bytes.
+    """
+    try:
+        import resource
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_memory(function: callable, array) -> dict:
+    """
+    Measures the Python level memory allocations of a single execution of `function` with tracemalloc.
+    The execution runs on a private copy of `array`, whose allocation is not counted.
+
+    Tracemalloc only exposes the current and the peak traced memory, so the total allocated bytes are
+    accumulated from the growth of the traced memory between consecutive calls and returns of the
+    execution: allocations freed before the next call are not seen, making it a lower bound.
+
+    Args:
+        function (callable): the function to be measured. It must accept a single array argument.
+        array (array-like): input array, never modified.
+
+    Returns:
+        dict: `MEMORY_METRICS` in bytes
+            peak_bytes: peak of the traced memory above the memory traced before the execution,
+            allocated_bytes: total bytes allocated during the execution (lower bound),
+            retained_bytes: traced memory still allocated after the execution (e.g. the returned objects),
+            peak_rss_bytes: None, only available with `measure_memory_subprocess`.
+    """
+
+    data = np.array(array)
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    allocation = {"last": baseline, "allocated": 0}
+
+    def profiler(frame, event, arg):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > allocation["last"]:
+            allocation["allocated"] += current - allocation["last"]
+        allocation["last"] = current
+
+    previous_profiler = sys.getprofile()
+    sys.setprofile(profiler)
+    try:
+        result = function(data)
+    finally:
+        sys.setprofile(previous_profiler)
+        profiler(None, "return", None)
+        current, peak = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+    del result
+
+    return {
+        "peak_bytes": peak - baseline,
+        "allocated_bytes": max(allocation["allocated"], peak - baseline),
+        "retained_bytes": max(current - baseline, 0),
+        "peak_rss_bytes": None
+    }
+
+
+def _measure_memory_process(algorithm_name, array):
+    sorting_algorithm = MeasurableTimeExecutionAlgorithm()
+    sorting_algorithm.set(getattr(AlgoritmiDiOrdinamento, algorithm_name))
+    data = np.array(array)
+
+    rss_before = peak_rss_bytes()
+    memory_usage = measure_memory(sorting_algorithm.execute, data)
+    memory_usage["peak_rss_bytes"] = max(peak_rss_bytes() - rss_before, 0)
+    return memory_usage
+
+
+def measure_memory_subprocess(algorithm_name: str, array) -> dict:
+    """
+    Runs `measure_memory` in a freshly spawned process, so that the growth of the peak resident set size
+    is caused by the execution alone and not by the memory already held by the caller.
+
+    Args:
+        algorithm_name (str): name of a sorting algorithm of AlgoritmiDiOrdinamento.
+        array (array-like): input array, never modified.
+
+    Returns:
+        dict: `MEMORY_METRICS` in bytes, see `measure_memory`.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_measure_memory_process, algorithm_name, np.asarray(array)).result()
+
+
+def measure_container_array(array_sample_container: ArrayDataManager.ArraySampleContainer,
+                            function: callable,
+                            minTime: float = None,
+                            fresh_input: bool = False,
+                            adaptive: bool = False,
+                            verify_integrity: bool = True,
+                            operation_counter: callable = None,
+                            memory_profiler: callable = None) -> list[ArrayDataManager.ArrayExecutionTime]:
     """
     Measures the execution time of an algorithm (function) on each array contained in an ArraySampleContainer object.
 
@@ -149,53 +459,90 @@ def measure_container_array(array_sample_container: ArrayDataManager.ArraySample
         array_sample_container (ArraySampleContainer): container of arrays to measure.
         function (callable of MeasurableTimeExecutionAlgorithm): wrapper of the algorithm to be measured (must be already set).
         minTime (float, optional): minimum cumulative time to measure for each array to obtain a stable average.
-            If not specified, it is computed via `SortingSettings.compute_min_time()`.
+            If not specified, it is read from the host calibration profile via `TimerCalibration.get_min_time()`.
+        fresh_input (bool, optional): if True, each execution receives a fresh copy of the array (see
+            `measure_fresh_input`); the copy-overhead-corrected times are stored as execution times and the
+            raw ones as `raw_execution_times`.
+        adaptive (bool, optional): if True, the number of repetitions of each sample is chosen by
+            `measure_sample_adaptive` instead of measuring every array once.
+        verify_integrity (bool, optional): if True, the checksum of every array is recorded before the measurement
+            and verified afterwards.
+        operation_counter (callable, optional): if specified (e.g. `MeasurableTimeExecutionAlgorithm.count_operations`),
+            it is executed once on every array of the samples and its counts are stored as `operation_counts`.
+        memory_profiler (callable, optional): if specified (e.g. `MeasurableTimeExecutionAlgorithm.measure_memory`),
+            it is executed once on every array of the samples and its metrics are stored as `memory_usage`.
 
     Returns:
         List[ArrayExecutionTime]: list of objects representing average execution times for each array configuration.
 
     Raises:
         AssertionError: if `array_sample_container` is not an instance of `ArraySampleContainer`, or if the container
-        structure is altered during measurement.
+        arrays are altered during measurement.
     """
 
-    # Create two deep copies of the array container to compare structural integrity and operate safely
-    array_sample_container_copy_comparison = copy.deepcopy(array_sample_container)
-    array_sample_container_copy = copy.deepcopy(array_sample_container)
+    # Type check: must be an instance of ArraySampleContainer
+    assert isinstance(array_sample_container, ArrayDataManager.ArraySampleContainer), \
+        f"Chunk element expected as ArraySampleContainer, got {type(array_sample_container)}"
+
+    # Checksums of the original arrays, the measurements only work on private copies of them
+    if verify_integrity:
+        checksums = array_sample_container.get_checksums()
 
     # If minTime is not specified, compute it dynamically
     if minTime is None:
-        minTime = SortingSettings.compute_min_time()
+        minTime = TimerCalibration.get_min_time()
     
-    # Initial quick test to activate potential warm-up optimizations
-    [measure(function, minTime, [i for i in range(100)])]
+    overhead = TimerCalibration.get_loop_overhead_correction()
 
-    # Type check: must be an instance of ArraySampleContainer
-    assert isinstance(array_sample_container, ArrayDataManager.ArraySampleContainer), \
-        f"Chunk element expected as ArraySampleContainer, got {type(array_sample_container)}"
+    # Initial quick test to activate potential warm-up optimizations (once per algorithm)
+    warm_up(function, minTime)
     
     array_execution_times = []  # List of timing results
 
     # Iterate through each array sample
-    for array_sample in array_sample_container_copy.get_samples():
+    for array_sample in array_sample_container.get_samples():
         time_repetitions = []
-
-        # For each repetition of the sample, measure execution time
-        for data in array_sample.get_sample():
-            time_repetitions.append(measure(function, minTime, data))
+        raw_time_repetitions = []
+
+        if adaptive:
+            time_repetitions, raw_time_repetitions = measure_sample_adaptive(function, minTime, array_sample.get_sample(), fresh_input, overhead= overhead)
+            # a single run with one time for each array of the sample
+            time_repetitions, raw_time_repetitions = [time_repetitions], [raw_time_repetitions]
+        else:
+            # For each repetition of the sample, measure execution time
+            for data in array_sample.get_sample():
+                if fresh_input:
+                    raw_time, corrected_time = measure_fresh_input(function, minTime, data)
+                    time_repetitions.append(corrected_time)
+                    raw_time_repetitions.append(raw_time)
+                else:
+                    # Private copy of a single array: in-place algorithms never touch the original one
+                    time_repetitions.append(measure(function, minTime, np.array(data), overhead= overhead))
+
+        # Instrumented executions run apart from the timed ones, so they never affect the measured times
+        operation_counts = None
+        if operation_counter is not None:
+            operation_counts = [operation_counter(data) for data in array_sample.get_sample()]
+
+        memory_usage = None
+        if memory_profiler is not None:
+            memory_usage = [memory_profiler(data) for data in array_sample.get_sample()]
 
         # Build an ArrayExecutionTime object for each sample
         array_execution_times.append(
             ArrayDataManager.ArrayExecutionTime(
                 variability = array_sample.get_variability(),
                 execution_times = time_repetitions,
-                creation_arguments = array_sample.get_creation_arguments()
+                creation_arguments = array_sample.get_creation_arguments(),
+                raw_execution_times = raw_time_repetitions if fresh_input else None,
+                operation_counts = operation_counts,
+                memory_usage = memory_usage
             )
         )
 
-    # Verify that the initial structure was not modified during measurement
-    assert ArrayDataManager.deep_compare(array_sample_container.to_dict(), 
-                                         array_sample_container_copy_comparison.to_dict()), \
-        f"Modification in array structure detected."
+    # Verify that the original arrays were not modified during measurement
+    if verify_integrity:
+        assert array_sample_container.get_checksums() == checksums, \
+            f"Modification in array structure detected."
     
     return array_execution_times
\ No newline at end of file
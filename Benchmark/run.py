@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+
+## sibling modules of the Benchmark folder are imported by name (as in the notebooks)
+BENCHMARK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+if BENCHMARK_FOLDER not in sys.path:
+    sys.path.insert(0, BENCHMARK_FOLDER)
+
+import AlgoritmiDiOrdinamento
+import SortingMeasurement
+import OperationCounting
+import BenchmarkPipeline
+import ParallelMeasurement
+
+from Utils import ArrayDataManager
+from Utils import ArraySettings
+from Utils import SortingSettings
+
+
+def get_algorithms(algorithm_names: list[str]) -> list[callable]:
+    """
+    Returns the sorting algorithms of AlgoritmiDiOrdinamento with the given names.
+    """
+    algorithms = []
+    for algorithm_name in algorithm_names:
+        if algorithm_name not in SortingMeasurement.AlgorithmArguments:
+            raise Exception(f"Unknown algorithm {algorithm_name}.\nAvailable algorithms: {list(SortingMeasurement.AlgorithmArguments.keys())}")
+        algorithms.append(getattr(AlgoritmiDiOrdinamento, algorithm_name))
+    return algorithms
+
+
+def run(algorithms: list[callable],
+        storage_folders: list[str] = None,
+        destination_folder: str = None,
+        minTime: float = None,
+        workers: int = 1,
+        pin_cpus: bool = False,
+        fresh_input: bool = False,
+        adaptive: bool = False,
+        count_operations: bool = False,
+        profile_memory: bool = False,
+        profile: ArraySettings.VariabilityProfile = None,
+        file_format: str = None) -> ArrayDataManager.ExecutionTimeDataStorage:
+    """
+    Measures the algorithms over the storage folders and saves the execution times files, without any interaction.
+    With a single worker the chunk files are measured one at a time (see `BenchmarkPipeline.measure_storage_streaming`),
+    otherwise every array is loaded and measured by a process pool (see `ParallelMeasurement.measure_folders_parallel`).
+
+    Args:
+        algorithms (list[callable]): sorting algorithms of AlgoritmiDiOrdinamento to be measured.
+        storage_folders (list[str], optional): names of the storage folders, all of them if not specified.
+        destination_folder (str, optional): folder of the execution times files, the execution times folder of the profile if not specified.
+        minTime (float, optional): minimum cumulative time to measure for each array, from the calibration profile if not specified.
+        workers (int, optional): number of worker processes.
+        pin_cpus (bool, optional): binds each worker process to a different CPU (see `ParallelMeasurement.measure_folders_parallel`).
+        fresh_input (bool, optional): see `SortingMeasurement.measure_container_array`.
+        adaptive (bool, optional): repetitions chosen by `SortingMeasurement.measure_sample_adaptive` (single worker only).
+        count_operations (bool, optional): also counts the operations of every array (single worker only).
+        profile_memory (bool, optional): also measures the memory used by every array (single worker only).
+        profile (VariabilityProfile, optional): variability of the run, `ArraySettings.DEFAULT_PROFILE` if not specified.
+        file_format (str, optional): format of the execution times files, '.time' pickles or columnar '.npz' files,
+            the default format of the profile if not specified (see `BenchmarkPipeline.default_file_format`).
+
+    Returns:
+        ExecutionTimeDataStorage: execution times of the whole run.
+    """
+
+    profile = profile or ArraySettings.DEFAULT_PROFILE
+    execution_time_storage = ArrayDataManager.ExecutionTimeDataStorage()
+
+    if workers == 1:
+        for folder_path, chunk_execution_times in BenchmarkPipeline.measure_storage_streaming(
+            algorithms = algorithms,
+            storage_folders = storage_folders,
+            destination_folder = destination_folder,
+            minTime = minTime,
+            fresh_input = fresh_input,
+            adaptive = adaptive,
+            count_operations = count_operations,
+            profile_memory = profile_memory,
+            profile = profile,
+            file_format = file_format
+        ):
+            print(f"Measured {folder_path}")
+            execution_time_storage.merge(chunk_execution_times)
+        if not execution_time_storage.keys():
+            print(f"No array chunk files found in {profile.main_array_storage_folder_path}, generate them with create_sample_arrays.py")
+        return execution_time_storage
+
+    assert not adaptive and not count_operations and not profile_memory, "Adaptive measurements, operation counting and memory profiling run with a single worker only"
+
+    folders_data_storage = ArrayDataManager.FoldersDataStorage()
+    for folder_path, array_sample_container in BenchmarkPipeline.iterate_storage_chunks(storage_folders, get_all= storage_folders is None, profile= profile):
+        folders_data_storage.update(folder_path= folder_path, array_sample_container= array_sample_container)
+    print(f"Loaded {len(folders_data_storage.keys())} array sets:")
+    print('\n'.join(folders_data_storage.keys()))
+
+    execution_time_storage = ParallelMeasurement.measure_folders_parallel(
+        folders_data_storage = folders_data_storage,
+        algorithms = algorithms,
+        minTime = minTime,
+        workers = workers,
+        pin_cpus = pin_cpus,
+        fresh_input = fresh_input,
+        profile = profile
+    )
+    BenchmarkPipeline.save_execution_times(execution_time_storage, destination_folder, profile, file_format= file_format)
+    return execution_time_storage
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser("Run the sorting algorithms benchmark")
+    parser.add_argument("-a", "--algorithms", help="Names of the sorting algorithms to be measured.", nargs="+", type=str, default= SortingSettings.DEFAULT_BENCHMARK_ALGORITHMS)
+    parser.add_argument("-s", "--storage", help="Names of the storage folders to be measured, all of them if not specified.", nargs="+", type=str, default= None)
+    parser.add_argument("-v", "--variability", help="Variabilities of the storage folders, measured one after the other: N (array length) and/or M (value range).", nargs="+", type=str.upper, choices= [variability.value["code"] for variability in ArraySettings.Variability], default= [ArraySettings.VARIABILITY.value["code"]])
+    parser.add_argument("-j", "--jobs", help="Number of worker processes.", type=int, default=1)
+    parser.add_argument("--pin-cpus", help="Binds each worker process to a different CPU (with --jobs).", action='store_true')
+    parser.add_argument("-t", "--min-time", help="Minimum cumulative time (s) measured for each array, from the calibration profile if not specified.", type=float, default= None)
+    parser.add_argument("-o", "--output", help="Folder of the execution times files (one subfolder for each variability when more are selected).", type=str, default= None)
+    parser.add_argument("-r", "--resume", help="Path of a run journal: the run is checkpointed and resumed if interrupted (single worker).", type=str, default= None)
+    parser.add_argument("--fresh-input", help="Each execution receives a fresh copy of the array.", action='store_true')
+    parser.add_argument("--adaptive", help="Measures each sample until the 95%% confidence interval of its mean is tight enough (see SortingSettings.ADAPTIVE_*).", action='store_true')
+    parser.add_argument("--count-operations", help="Also counts the operations of every array.", action='store_true')
+    parser.add_argument("--profile-memory", help="Also measures the memory used by every array.", action='store_true')
+    parser.add_argument("--format", help="Format of the execution times files: '.time' pickles (read by the notebooks) or columnar '.npz' files (execution times only), columnar for the NM grid and '.time' otherwise if not specified.", type=str, choices= SortingSettings.EXECUTION_TIMES_FORMATS, default= None)
+    parser.add_argument("--fit", help="Prints the fit of seconds = c * n^a * m^b of every algorithm (always printed for the NM grid).", action='store_true')
+    args = parser.parse_args()
+    if args.resume and (args.jobs != 1 or args.adaptive or args.count_operations or args.profile_memory):
+        parser.error("--resume runs with a single worker and supports neither --adaptive, --count-operations nor --profile-memory")
+    if args.jobs != 1 and (args.adaptive or args.count_operations or args.profile_memory):
+        parser.error("--adaptive, --count-operations and --profile-memory run with a single worker only")
+
+    output = os.path.abspath(args.output) if args.output else None
+    journal_path = os.path.abspath(args.resume) if args.resume else None
+    # storage folder paths are relative to the project root
+    os.chdir(SortingMeasurement.projectRoot)
+    profiles = [ArraySettings.VariabilityProfile.from_code(code) for code in dict.fromkeys(args.variability)]
+
+    algorithms = get_algorithms(args.algorithms)
+    if args.count_operations:
+        algorithms_to_count = [algorithm.__name__ for algorithm in algorithms if algorithm.__name__ not in OperationCounting.NOT_INSTRUMENTABLE_ALGORITHMS]
+        print(f"Counting operations of: {', '.join(algorithms_to_count)}")
+
+    for profile in profiles:
+        profile_output = output
+        profile_journal_path = journal_path
+        if len(profiles) > 1:
+            profile_output = os.path.join(output, f"{profile.code}_variability") if output else None
+            # e.g. run.journal -> run_N.journal, run_M.journal
+            profile_journal_path = "{0}_{2}{1}".format(*os.path.splitext(journal_path), profile.code) if journal_path else None
+        print(f"Variability: {profile}")
+
+        start_time = time.perf_counter()
+        if profile_journal_path:
+            execution_time_storage = BenchmarkPipeline.measure_storage_journaled(
+                profile_journal_path,
+                algorithms = algorithms,
+                storage_folders = args.storage,
+                destination_folder = profile_output,
+                minTime = args.min_time,
+                fresh_input = args.fresh_input,
+                profile = profile,
+                file_format = args.format
+            )
+        else:
+            execution_time_storage = run(
+                algorithms = algorithms,
+                storage_folders = args.storage,
+                destination_folder = profile_output,
+                minTime = args.min_time,
+                workers = args.jobs,
+                pin_cpus = args.pin_cpus,
+                fresh_input = args.fresh_input,
+                adaptive = args.adaptive,
+                count_operations = args.count_operations,
+                profile_memory = args.profile_memory,
+                profile = profile,
+                file_format = args.format
+            )
+
+        print(f"Execution times saved at: {os.path.abspath(profile_output or profile.execution_times_folder)} ({time.perf_counter() - start_time:.1f}s)")
+
+        if (args.fit or profile.grid) and execution_time_storage.keys():
+            for algorithm, fit in BenchmarkPipeline.fit_power_laws(execution_time_storage).items():
+                print(f"{algorithm}: seconds = {fit['coefficient']:.3e} * n^{fit['n_exponent']:.3f} * m^{fit['m_exponent']:.3f} (R^2 = {fit['r_squared']:.3f})")
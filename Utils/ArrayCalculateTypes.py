@@ -2,27 +2,39 @@ import numpy as np
 
 
 numpy_datatypes = [(8, np.int8), (16, np.int16), (32, np.int32), (64, np.int64)]
+numpy_unsigned_datatypes = [(8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64)]
+## floating point types with the bits of their significand: every integer up to 2**bits is represented exactly
+numpy_float_datatypes = [(24, np.float32), (53, np.float64)]
 
 
 def getBitNumberRepresentationLength(number):
     return np.ceil(np.log(number) / np.log(2))
 
-    
-def __calculateMinimumExpensiveType(number, typeList):
-    numberBitsNeeded = getBitNumberRepresentationLength(number)
+
+def __calculateMinimumExpensiveType(maxNumber, minNumber, typeList):
 
     for typeRep in typeList:
-        if numberBitsNeeded < typeRep[0]:
+        if np.issubdtype(typeRep[1], np.floating):
+            if max(abs(maxNumber), abs(minNumber)) <= 2**typeRep[0]:
+                return typeRep[1]
+        elif np.iinfo(typeRep[1]).min <= minNumber and maxNumber <= np.iinfo(typeRep[1]).max:
             return typeRep[1]
-    
+
     raise Exception
 
 
-def calculateMinimumExpensiveArrayType(maxArrayVariabilityNumber):
-     
+# maxArrayVariabilityNumber / minArrayVariabilityNumber: greatest and lowest number of the arrays,
+# unsigned: unsigned types are used when no number is negative,
+# floating: floating point type representing exactly every integer of the range
+def calculateMinimumExpensiveArrayType(maxArrayVariabilityNumber, minArrayVariabilityNumber=0, unsigned=True, floating=False):
+
+    typeList = numpy_datatypes
+    if floating:
+        typeList = numpy_float_datatypes
+    elif unsigned and minArrayVariabilityNumber >= 0:
+        typeList = numpy_unsigned_datatypes
+
     try:
-        return __calculateMinimumExpensiveType(maxArrayVariabilityNumber, numpy_datatypes)
+        return __calculateMinimumExpensiveType(maxArrayVariabilityNumber, minArrayVariabilityNumber, typeList)
     except:
-        raise Exception(f"Unable to detect datatype for array representation!\nMAX_NUMBER_IN_SAMPLER_RANGE: {MAX_NUMBER_IN_SAMPLER_RANGE} > MAX_NUMBER_AVAILABLE: {np.pow(2, numpy_datatypes[-1][0])/2-1}")
-
-        
\ No newline at end of file
+        raise Exception(f"Unable to detect datatype for array representation!\nNumbers range: [{minArrayVariabilityNumber}, {maxArrayVariabilityNumber}] not representable by {[np.dtype(typeRep[1]).name for typeRep in typeList]}")
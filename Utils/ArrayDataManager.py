@@ -2,6 +2,19 @@ from typing_extensions import override
 import numpy as np
 from Utils import ArrayStorageCompressor
 import os
+import json
+import bisect
+import hashlib
+import functools
+
+# extension of ColumnarExecutionTimeStorage files
+COLUMNAR_EXTENSION = ".npz"
+
+# maximum number of centroids kept by a QuantileSketch (quantiles are exact below this number of values)
+QUANTILE_SKETCH_SIZE = 1024
+
+# number of virtual samples (all repetitions of a key) kept in memory after generation
+VIRTUAL_SAMPLE_CACHE_SIZE = 8
 
 def deep_compare(a, b):
     if isinstance(a, dict) and isinstance(b, dict):
@@ -17,6 +30,30 @@ def deep_compare(a, b):
     else:
         return (a == b, a,b)
 
+def array_checksum(array):
+    # blake2b digest of the raw buffer (dtype and shape included)
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(f"{array.dtype.str}{array.shape}".encode("utf-8"), digest_size=16)
+    digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+# variability keys are int for the sweeps over a single dimension and (n, m) tuples for the grid sweeps,
+# json files (generation parameters, memory mapped indexes, run journals) store them as "key" or "n,m"
+def is_variability_key(key):
+    if isinstance(key, tuple):
+        return len(key) == 2 and all(isinstance(value, (int, np.integer)) for value in key)
+    return isinstance(key, (int, np.integer))
+
+def variability_key_to_str(key):
+    return ",".join(str(int(value)) for value in key) if isinstance(key, tuple) else str(int(key))
+
+def parse_variability_key(key):
+    if isinstance(key, (tuple, list)):
+        return tuple(int(value) for value in key)
+    if isinstance(key, str) and "," in key:
+        return tuple(int(value) for value in key.split(","))
+    return int(key)
+
 def merge(data, new_data):
     if isinstance(data, list):
         if isinstance(new_data, list):
@@ -90,13 +127,23 @@ class BaseDataDictionary:
 """
 
 class ArraySampleCreationArguments:
-    _ordered_keys = ["n", "m", "rep", "seeds", "dtype"]
-    def __init__(self, n = None, m = None, rep = None, seeds = None, dtype = None):
+    _ordered_keys = ["n", "m", "rep", "seeds", "dtype", "seeding", "distribution", "distribution_parameter", "offset"]
+    # class level defaults keep previously pickled objects readable
+    seeding = None
+    distribution = None
+    distribution_parameter = None
+    offset = None
+
+    def __init__(self, n = None, m = None, rep = None, seeds = None, dtype = None, seeding = None, distribution = None, distribution_parameter = None, offset = None):
         self.n = None
         self.m = None
         self.rep = None
         self.seeds = None
         self.dtype = None
+        self.seeding = None
+        self.distribution = None
+        self.distribution_parameter = None
+        self.offset = None
         if n:
             self.set_length(n)
         if m:
@@ -107,6 +154,14 @@ class ArraySampleCreationArguments:
             self.set_generation_seeds(seeds)
         if dtype:
             self.set_data_type(dtype)
+        if seeding:
+            self.set_seeding(seeding)
+        if distribution:
+            self.set_distribution(distribution)
+        if distribution_parameter is not None:
+            self.set_distribution_parameter(distribution_parameter)
+        if offset:
+            self.set_offset(offset)
 
     def set_length(self, n):
         if not isinstance(n, (int, np.integer)) or n <= 0:
@@ -135,6 +190,26 @@ class ArraySampleCreationArguments:
             raise TypeError(f"Field 'dtype' is not a valid numpy dtype.")
         self.dtype = np.dtype(dtype)
 
+    def set_seeding(self, seeding):
+        if not isinstance(seeding, str):
+            raise ValueError(f"Field 'seeding' must be a string.")
+        self.seeding = seeding
+
+    def set_distribution(self, distribution):
+        if not isinstance(distribution, str):
+            raise ValueError(f"Field 'distribution' must be a string.")
+        self.distribution = distribution
+
+    def set_distribution_parameter(self, distribution_parameter):
+        if not isinstance(distribution_parameter, (int, float, np.integer, np.floating)):
+            raise ValueError(f"Field 'distribution_parameter' must be a number.")
+        self.distribution_parameter = float(distribution_parameter)
+
+    def set_offset(self, offset):
+        if not isinstance(offset, (int, np.integer)):
+            raise ValueError(f"Field 'offset' must be an integer.")
+        self.offset = int(offset)
+
     
     def get_length(self):
         return self.n
@@ -151,9 +226,22 @@ class ArraySampleCreationArguments:
     def get_data_type(self):
         return self.dtype
 
+    def get_seeding(self):
+        return self.seeding
+
+    def get_distribution(self):
+        return self.distribution
+
+    def get_distribution_parameter(self):
+        return self.distribution_parameter
+
+    def get_offset(self):
+        return self.offset
+
     def __eq__(self, other):
+        # compared by fields: previously pickled objects lack the most recent attributes
         return (isinstance(other, self.__class__)
-            and self.__dict__ == other.__dict__)
+            and self.to_dict() == other.to_dict())
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -161,7 +249,8 @@ class ArraySampleCreationArguments:
     def __str__(self):
         return(
             f"length: {self.n}, number variability: {self.m}, "
-            f"repetitions: {self.rep}, seeds: {self.seeds}, dtype: {self.dtype}"
+            f"repetitions: {self.rep}, seeds: {self.seeds}, dtype: {self.dtype}, seeding: {self.seeding}, "
+            f"distribution: {self.distribution}, distribution parameter: {self.distribution_parameter}, offset: {self.offset}"
         )
 
     def to_dict(self, as_json=False):
@@ -190,7 +279,11 @@ class ArraySampleCreationArgumentsBuilder:
             "m": None,
             "rep": None,
             "seeds": None,
-            "dtype": None
+            "dtype": None,
+            "seeding": None,
+            "distribution": None,
+            "distribution_parameter": None,
+            "offset": None
         }
         
     def set_length(self, n):
@@ -229,6 +322,27 @@ class ArraySampleCreationArgumentsBuilder:
             raise TypeError(f"Field 'dtype' is not a valid numpy dtype.")
         return self
 
+    def set_seeding(self, seeding):
+        if seeding is not None and not isinstance(seeding, str):
+            raise ValueError(f"Field 'seeding' must be a string.")
+        self._data["seeding"] = seeding
+        return self
+
+    def set_distribution(self, distribution, distribution_parameter= None):
+        if distribution is not None and not isinstance(distribution, str):
+            raise ValueError(f"Field 'distribution' must be a string.")
+        if distribution_parameter is not None and not isinstance(distribution_parameter, (int, float, np.integer, np.floating)):
+            raise ValueError(f"Field 'distribution_parameter' must be a number.")
+        self._data["distribution"] = distribution
+        self._data["distribution_parameter"] = None if distribution_parameter is None else float(distribution_parameter)
+        return self
+
+    def set_offset(self, offset):
+        if offset is not None and not isinstance(offset, (int, np.integer)):
+            raise ValueError(f"Field 'offset' must be an integer.")
+        self._data["offset"] = None if not offset else int(offset)
+        return self
+
     def build(self):
         return self.creation_arguments(**self._data)
 
@@ -255,12 +369,15 @@ class ArraySampleCreationArgumentsBuilder:
     def builder_on_numbers(n, m):
         return ArraySampleCreationArgumentsBuilder(ArraySampleCreationArguments).set_length(n).set_number_variability(m)
 
+    def builder_on_grid(n, m):
+        return ArraySampleCreationArgumentsBuilder(ArraySampleCreationArguments).set_length(n).set_number_variability(m)
+
         
 class ArraySample:
     def __init__(self, sample: list, creation_arguments: ArraySampleCreationArguments, variability):
         assert isinstance(sample, list), f"Expected list, got {type(sample)}."
         assert isinstance(creation_arguments, (dict, ArraySampleCreationArguments)), f"Creation arguments are expected as ArraySampleCreationArguments or dict, got {type(creation_arguments)}."
-        assert isinstance(variability, int), f"Key variability is expected as int, got {type(variability)}."
+        assert is_variability_key(variability), f"Key variability is expected as int or (n, m) tuple, got {type(variability)}."
         self.sample = sample
         self.creation_arguments = creation_arguments if isinstance(creation_arguments, ArraySampleCreationArguments) else ArraySampleCreationArguments(**creation_arguments)
         self.variability = variability
@@ -292,6 +409,58 @@ class ArraySample:
 
 
 
+@functools.lru_cache(maxsize=VIRTUAL_SAMPLE_CACHE_SIZE)
+def materialize_sample(n, m, rep, seeds, dtype, seeding=None, distribution=None, distribution_parameter=None, offset=None):
+    # imported here: ArrayGenerator depends on this module
+    from Utils import ArrayGenerator
+    arrays = ArrayGenerator.sample(n, m, rep, dtype, list(seeds), seeding=seeding, distribution=distribution, distribution_parameter=distribution_parameter, offset=offset)
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+class VirtualArraySample(ArraySample):
+    """
+    ArraySample that does not store its arrays: they are regenerated on demand from the creation arguments,
+    whose recorded seeds make the generation deterministic. The most recently used samples are cached
+    (see VIRTUAL_SAMPLE_CACHE_SIZE), get_sample() always returns writable copies so that in-place
+    algorithms never alter the cache.
+    """
+
+    def __init__(self, creation_arguments: ArraySampleCreationArguments, variability):
+        super().__init__([], creation_arguments, variability)
+        seeds = self.creation_arguments.get_generation_seeds()
+        assert seeds and None not in seeds and len(seeds) == self.creation_arguments.get_repetitions(), \
+            f"Virtual samples need one recorded seed per repetition, got {seeds}."
+
+    def get_sample(self):
+        creation_arguments = self.creation_arguments.to_dict(as_json=True)
+        creation_arguments["seeds"] = tuple(int(seed) for seed in creation_arguments["seeds"])
+        return [array.copy() for array in materialize_sample(**creation_arguments)]
+
+
+class MemoryMappedArraySample(ArraySample):
+    """
+    ArraySample whose repetitions live in a raw buffer file on disk, stored contiguously as a (rep, n) block
+    starting at `offset` bytes. get_sample() maps only that block with a copy-on-write np.memmap and returns
+    zero-copy views of its rows: pages are read lazily and in-place writes never reach the file.
+    """
+
+    def __init__(self, creation_arguments: ArraySampleCreationArguments, variability, buffer_path, offset):
+        super().__init__([], creation_arguments, variability)
+        self.buffer_path = buffer_path
+        self.offset = offset
+
+    def get_sample(self):
+        rows = np.memmap(
+            self.buffer_path,
+            dtype = self.creation_arguments.get_data_type(),
+            mode = 'c',
+            offset = self.offset,
+            shape = (self.creation_arguments.get_repetitions(), self.creation_arguments.get_length())
+        )
+        return list(rows)
+
    
 
 def assert_dict_with_ArraySample(data):
@@ -313,20 +482,26 @@ class ArraySampleContainer(BaseDataDictionary):
         - getIndeciesOfUniformlySubdividedArray(n_chunks, interval=None): returns indices for uniform partitioning.
         - subdivideArrayUniformly(n_chunks, returnWithData=True, interval=None): returns sub-containers or lists of keys.
         - get_creation_arguments(): returns creation arguments for all samples in dict format.
+        - get_checksums(): returns the checksum of every array, used to verify that arrays were not modified.
         - estimate_data_size_MB(): estimates the total data size in MB.
         - getFromIntervall(start, end): returns a sub-dictionary for a given index range.
+        - getFromVariabilityInterval(start, end): returns a sub-dictionary for a given key value range.
         - getFromKeys(keys): returns a sub-dictionary for a given set of keys.
         - to_dict(): converts the content to a standard dict format.
 
     Overrides:
         - __eq__, __hash__, __len__, __contains__, __getitem__
 
+    The sorted keys are cached and invalidated on every update, so lookups by key or by position are O(1)
+    and interval queries are solved by bisection.
+
     Raises:
         AssertionError: if the provided data is not in the expected format (validated by assert_dict_with_ArraySample).
         IndexError: in various methods when accessing invalid keys or intervals.
     """
 
-
+    # sorted keys cache (class level default keeps previously pickled containers readable)
+    _sorted_keys = None
 
     def __init__(self, initial_data= {}):
         if isinstance(initial_data, ArraySampleContainer):
@@ -339,6 +514,17 @@ class ArraySampleContainer(BaseDataDictionary):
     def update(self, data, **options):
         assert_dict_with_ArraySample(data)
         super().update(data, **options)
+        self._sorted_keys = None
+
+    def clear(self):
+        super().clear()
+        self._sorted_keys = None
+
+    def _get_sorted_keys(self):
+        # the length check also catches direct writes on self.data
+        if self._sorted_keys is None or len(self._sorted_keys) != len(self.data):
+            self._sorted_keys = sorted(self.data.keys())
+        return self._sorted_keys
 
     # interval is exclusive for the end: [start, end)
     def getIndeciesOfUniformlySubdividedArray(self, n_chunks, interval=None):
@@ -381,10 +567,11 @@ class ArraySampleContainer(BaseDataDictionary):
         """
 
         chunks = self.getIndeciesOfUniformlySubdividedArray(n_chunks, interval)
+        sorted_keys = self._get_sorted_keys()
     
         if returnWithData:
             for start, end in chunks:
-                keys = self.keys(toSort=True)[start:end]
+                keys = sorted_keys[start:end]
                 outputDict = {}
                 for k in keys:
                     outputDict[k] = self.data[k]
@@ -392,7 +579,7 @@ class ArraySampleContainer(BaseDataDictionary):
         else:
             outputKeys = []
             for start, end in chunks:
-                keys = self.keys(toSort=True)[start:end]
+                keys = sorted_keys[start:end]
                 outputKeys.append(keys)
             return outputKeys
 
@@ -407,26 +594,34 @@ class ArraySampleContainer(BaseDataDictionary):
         """
 
         if byKey:
-            if key in self.keys():
+            if key in self.data:
                 return self.data[key]
     
             raise IndexError(f"No '{key}' key found in {self.keys()}")
         else:
-            if 0 <= key < len(self.keys()):
-                return self.data[self.keys()[key]]
+            sorted_keys = self._get_sorted_keys()
+            if 0 <= key < len(sorted_keys):
+                return self.data[sorted_keys[key]]
     
             raise IndexError(f"Index {key} out of range [0,{len(self.keys(toSort=False))})")
             
 
+    def get_checksums(self):
+        """
+        Returns a dictionary {key: [checksum of each repetition]} of all samples (see array_checksum).
+        """
+
+        return {key: [array_checksum(data) for data in sample.get_sample()] for key, sample in self.items()}
+
     def get_creation_arguments(self):
         """
-        Returns a dictionary of creation arguments for all samples, indexed by integer key,
+        Returns a dictionary of creation arguments for all samples, indexed by integer key ("n,m" string for grid keys),
         with arguments serialized to JSON-friendly format.
         """
 
         creation_arguments = {}
         for key, sample in self.items():
-            creation_arguments[int(key)] = sample.get_creation_arguments().to_dict(as_json=True)
+            creation_arguments[variability_key_to_str(key) if isinstance(key, tuple) else int(key)] = sample.get_creation_arguments().to_dict(as_json=True)
         return creation_arguments
     
     def getFromIntervall(self, start, end):
@@ -434,7 +629,16 @@ class ArraySampleContainer(BaseDataDictionary):
         Returns a sub-dictionary for the specified range of indices [start:end].
         """
 
-        keys = self.keys()[start: end]
+        keys = self._get_sorted_keys()[start: end]
+        return self.getFromKeys(keys)
+
+    def getFromVariabilityInterval(self, start, end):
+        """
+        Returns a sub-dictionary with the keys whose value is in [start, end), found by bisection on the sorted keys.
+        """
+
+        sorted_keys = self._get_sorted_keys()
+        keys = sorted_keys[bisect.bisect_left(sorted_keys, start): bisect.bisect_left(sorted_keys, end)]
         return self.getFromKeys(keys)
     
 
@@ -455,10 +659,7 @@ class ArraySampleContainer(BaseDataDictionary):
         Raises IndexError if the interval is invalid.
         """
 
-        keys = list(self.data.keys())
-    
-        if toSort:
-            keys = sorted(keys)
+        keys = list(self._get_sorted_keys() if toSort else self.data.keys())
     
         if interval:
             start, end = interval
@@ -499,6 +700,79 @@ class ArraySampleContainer(BaseDataDictionary):
 
 
 
+def write_memory_mapped_storage(array_sample_container, path):
+    """
+    Writes an ArraySampleContainer in the memory mapped format: the arrays of each dtype are appended to a single
+    raw buffer file '<name>.<dtype>.raw', while '<name>.mmap' is a json index
+    {"buffers": {dtype: file name}, "samples": {key: {"dtype", "offset", "length", "rep", "creation_arguments"}}}
+    with offsets in bytes. Returns the index file path.
+    """
+
+    if path.endswith(ArrayStorageCompressor.MEMORY_MAP_EXTENSION):
+        path = path[:-len(ArrayStorageCompressor.MEMORY_MAP_EXTENSION)]
+    folder, name = os.path.split(path)
+
+    index = {"buffers": {}, "samples": {}}
+    buffer_files = {}
+    try:
+        for key in array_sample_container.keys(toSort=True):
+            array_sample = array_sample_container.get(key)
+            creation_arguments = array_sample.get_creation_arguments()
+            dtype = np.dtype(creation_arguments.get_data_type())
+
+            if dtype.name not in buffer_files:
+                index["buffers"][dtype.name] = name + "." + dtype.name + ArrayStorageCompressor.RAW_EXTENSION
+                buffer_files[dtype.name] = open(os.path.join(folder, index["buffers"][dtype.name]), "wb")
+            buffer_file = buffer_files[dtype.name]
+
+            index["samples"][variability_key_to_str(key)] = {
+                "dtype": dtype.name,
+                "offset": buffer_file.tell(),
+                "length": creation_arguments.get_length(),
+                "rep": creation_arguments.get_repetitions(),
+                "creation_arguments": creation_arguments.to_dict(as_json=True)
+            }
+            for data in array_sample.get_sample():
+                np.asarray(data).astype(dtype, copy=False).tofile(buffer_file)
+    finally:
+        for buffer_file in buffer_files.values():
+            buffer_file.close()
+
+    return ArrayStorageCompressor.writeOnFile(index, path + ArrayStorageCompressor.MEMORY_MAP_EXTENSION, return_file_path=True, as_json=True)
+
+
+def open_memory_mapped_storage(path):
+    """
+    Opens a storage written by write_memory_mapped_storage as an ArraySampleContainer of MemoryMappedArraySample.
+    Only the json index is read: arrays are mapped when requested.
+    """
+
+    index = ArrayStorageCompressor.readFromFile(path, as_json=True)
+    folder = os.path.dirname(path)
+
+    array_sample_container = ArraySampleContainer()
+    for key, entry in index["samples"].items():
+        array_sample_container.update({
+            parse_variability_key(key): MemoryMappedArraySample(
+                creation_arguments = ArraySampleCreationArguments(**entry["creation_arguments"]),
+                variability = parse_variability_key(key),
+                buffer_path = os.path.join(folder, index["buffers"][entry["dtype"]]),
+                offset = entry["offset"]
+            )
+        })
+    return array_sample_container
+
+
+def read_array_storage_file(path):
+    """
+    Reads an array storage file choosing the format from its extension (memory mapped, compressed with a registered codec or pickle).
+    """
+
+    if path.endswith(ArrayStorageCompressor.MEMORY_MAP_EXTENSION):
+        return open_memory_mapped_storage(path)
+    return ArrayStorageCompressor.readFromFile(path, decompress= ArrayStorageCompressor.get_codec_by_path(path) is not None)
+
+
 def assert_execution_time_dict_metadata(raw_chunk_data):
     required_keys = {"data", "metadata"}
     
@@ -549,7 +823,8 @@ class ExecutionTimeDataStorage(BaseDataDictionary):
             self.data[algorithm][array_folder] = new_values
         
 
-    def merge(self, other):
+    # skip_existing_runs: runs already present are skipped instead of raising an error (e.g. a resumed run saved again)
+    def merge(self, other, skip_existing_runs= False):
         assert isinstance(other, (ExecutionTimeDataStorage, dict)), f"Expected ExecutionTimeDataStorage or dictionary, got {type(other)}"
 
         if isinstance(other, dict):
@@ -569,13 +844,26 @@ class ExecutionTimeDataStorage(BaseDataDictionary):
                 other_execution_times = other.get_execution_times(other_algorithm, other_folder_path)
                 
                 assert isinstance(execution_times, list), f"Expected list, got {type(execution_times)}"
-                assert len(execution_times) == len(other_execution_times), f"Expected same sample execution number, expected {len(execution_times)}, got {len(other_execution_times)}"
-                
-                for current_execution_time, other_execution_time in zip(execution_times, other_execution_times):
+
+                # execution times are matched by variability: known keys receive a new run,
+                # unknown keys (e.g. another chunk of the same storage folder) are appended
+                execution_times_by_variability = {execution_time.get_variability(): execution_time for execution_time in execution_times}
+                new_variability = False
+                for other_execution_time in other_execution_times:
                     assert isinstance(other_execution_time, ArrayExecutionTime), f"Expected ArrayExecutionTime, got {type(other_execution_time)}"
+
+                    current_execution_time = execution_times_by_variability.get(other_execution_time.get_variability())
+                    if current_execution_time is None:
+                        execution_times.append(other_execution_time)
+                        new_variability = True
+                        continue
         
-                    current_execution_time.extend(other_execution_time)
-                    current_execution_time.compute_time_analysis()
+                    current_execution_time.extend(other_execution_time, skip_existing_runs= skip_existing_runs)
+                    if not current_execution_time.get_time_analysis().is_incremental():
+                        current_execution_time.compute_time_analysis()
+
+                if new_variability:
+                    execution_times.sort(key=lambda execution_time: execution_time.get_variability())
 
     def to_dict(self):
         return {alg: {storage: [ext_time.to_dict() for ext_time in ext_times] for storage, ext_times in storage_dict.items()} for alg, storage_dict in self.items()}
@@ -583,22 +871,141 @@ class ExecutionTimeDataStorage(BaseDataDictionary):
 
         
 
+class QuantileSketch:
+    """
+    Mergeable quantile sketch: sorted centroids (value, weight). It is exact (same linear interpolation of np.quantile)
+    until it holds at most `max_size` values, then adjacent centroids are compressed into `max_size` groups of equal weight.
+    """
+
+    def __init__(self, max_size= QUANTILE_SKETCH_SIZE):
+        self.max_size = max_size
+        self.values = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+
+    def update(self, values):
+        values = np.sort(np.ravel(np.asarray(values, dtype=np.float64)))
+        self._merge_sorted(values, np.ones(len(values)))
+
+    def merge(self, other):
+        assert isinstance(other, QuantileSketch), f"Expected QuantileSketch, got {type(other)}"
+        self._merge_sorted(other.values, other.weights)
+
+    def _merge_sorted(self, values, weights):
+        values = np.concatenate([self.values, values])
+        # stable sort of two sorted runs is linear
+        order = np.argsort(values, kind="stable")
+        self.values, self.weights = values[order], np.concatenate([self.weights, weights])[order]
+
+        if len(self.values) > self.max_size:
+            cumulative_weights = np.cumsum(self.weights) - self.weights
+            groups = (cumulative_weights * self.max_size / self.weights.sum()).astype(np.int64)
+            group_weights = np.bincount(groups, weights=self.weights)
+            keep = group_weights > 0
+            self.values = (np.bincount(groups, weights=self.values * self.weights) / np.where(keep, group_weights, 1))[keep]
+            self.weights = group_weights[keep]
+
+    def quantile(self, q):
+        # position of each centroid is the mean rank of the values it holds
+        positions = np.cumsum(self.weights) - (self.weights + 1) / 2
+        return np.interp(q * (self.weights.sum() - 1), positions, self.values)
+
+
+# 97.5% quantiles of the Student's t distribution with 1..30 degrees of freedom (95% two-sided confidence intervals)
+STUDENT_T_975 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+def student_t_975(degrees_of_freedom):
+    """
+    97.5% quantile of the Student's t distribution, to be used in place of z = 1.96 for the mean of few values.
+    """
+    assert degrees_of_freedom >= 1, f"At least one degree of freedom is required, got {degrees_of_freedom}"
+    if degrees_of_freedom <= len(STUDENT_T_975):
+        return STUDENT_T_975[degrees_of_freedom - 1]
+    # first order Cornish-Fisher expansion around the normal quantile
+    return 1.96 + (1.96**3 + 1.96) / (4 * degrees_of_freedom)
+
+
 class TimeAnalysis:
+    # class level defaults keep previously pickled objects readable (their analysis is computed again from scratch)
+    count = None
+    m2 = None
+    sketch = None
+
+    QUANTILE_LEVELS = [0.01, 0.25, 0.5, 0.75, 0.99]
+
     def __init__(self):
+        self.count = None
         self.mean = None
         self.sd = None
         self.quantiles = {}
 
+    def is_incremental(self):
+        return self.m2 is not None and self.sketch is not None
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sd = None
+        self.quantiles = {}
+        self.sketch = QuantileSketch()
+
     def compute_analysis(self, execution_times):
-        
-        execution_times = np.array(execution_times, dtype=np.float64).flatten()
+        self.reset()
+        # runs may hold a different number of repetitions (adaptive measurements)
+        for chunk in execution_times:
+            self.update(chunk)
+
+    def update(self, execution_chunk):
+        """
+        Adds a run of execution times to the analysis (Welford/Chan update of mean and variance, quantile sketch).
+        """
+        if not self.is_incremental():
+            self.reset()
+
+        execution_chunk = np.ravel(np.asarray(execution_chunk, dtype=np.float64))
+        if len(execution_chunk) == 0:
+            return
+        chunk_mean = np.mean(execution_chunk)
+        self._combine(len(execution_chunk), chunk_mean, np.sum((execution_chunk - chunk_mean)**2))
+        self.sketch.update(execution_chunk)
+        self._finalize()
+
+    def merge(self, other):
+        """
+        Merges the analysis of another set of runs, as if its runs were added with update.
+        """
+        assert isinstance(other, TimeAnalysis) and other.is_incremental(), f"Expected incremental TimeAnalysis"
+        if not self.is_incremental():
+            self.reset()
+        if not other.count:
+            return
+
+        self._combine(other.count, other.mean, other.m2)
+        self.sketch.merge(other.sketch)
+        self._finalize()
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
 
-        self.mean = np.mean(execution_times)
-        self.sd = np.std(execution_times, ddof=1) 
+    def _finalize(self):
+        self.sd = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        self.quantiles = {q: self.sketch.quantile(q) for q in self.QUANTILE_LEVELS}
 
-        quantile_levels = [0.01, 0.25, 0.5, 0.75, 0.99]
-        self.quantiles = {q: np.quantile(execution_times, q) for q in quantile_levels}
 
+    def confidence_interval(self, z=1.96):
+        # half-width of the confidence interval of the mean (95% by default), NaN until two times are analysed
+        if not self.count or self.count < 2:
+            return np.nan
+        return z * self.sd / np.sqrt(self.count)
+
+    def relative_confidence_interval(self, z=1.96):
+        return self.confidence_interval(z) / self.mean
 
     def to_dict(self):
         return {
@@ -609,20 +1016,51 @@ class TimeAnalysis:
     
 
 
+def execution_run_id(execution_chunk):
+    """
+    Identifier of a run of execution times, used to detect the same run merged twice.
+    """
+    return array_checksum(np.asarray(execution_chunk, dtype=np.float64))
+
+
 class ArrayExecutionTime(ArraySample):
+    # class level defaults keep previously pickled objects readable
+    raw_execution_times = None
+    run_ids = None
+    run_ids_count = None
+    operation_counts = None
+    memory_usage = None
+
     # [ [...], [...], [...], [...], ... , [...] ]
-    def __init__(self, execution_times, creation_arguments, variability):
+    def __init__(self, execution_times, creation_arguments, variability, raw_execution_times= None, operation_counts= None, memory_usage= None):
         assert isinstance(execution_times, list), f"Expected list, got {type(execution_times)}"
         assert isinstance(creation_arguments, ArraySampleCreationArguments), f"Expected ArraySampleCreationArguments, got {type(creation_arguments)}"
 
         assert execution_times, f"Execution times must be a valid list"
         
         
-        rep = creation_arguments.get_repetitions()
-        if len(execution_times) == rep:
+        # a flat list of times is a single run, a list of lists holds more runs (or a single one of any length)
+        if np.ndim(execution_times[0]) == 0:
             execution_times = [execution_times]
         super().__init__(execution_times, creation_arguments, variability)
 
+        # execution times including the copy overhead (fresh input measurements only), same layout of sample
+        if raw_execution_times is not None:
+            assert isinstance(raw_execution_times, list), f"Expected list, got {type(raw_execution_times)}"
+            if raw_execution_times and np.ndim(raw_execution_times[0]) == 0:
+                raw_execution_times = [raw_execution_times]
+            self.raw_execution_times = raw_execution_times
+
+        # operations counted on each array of the sample (machine independent, equal for every run)
+        if operation_counts is not None:
+            assert isinstance(operation_counts, list), f"Expected list, got {type(operation_counts)}"
+            self.operation_counts = operation_counts
+
+        # memory used by a single execution on each array of the sample (see SortingMeasurement.measure_memory)
+        if memory_usage is not None:
+            assert isinstance(memory_usage, list), f"Expected list, got {type(memory_usage)}"
+            self.memory_usage = memory_usage
+
         
         self.time_analysis = TimeAnalysis()
 
@@ -630,19 +1068,85 @@ class ArrayExecutionTime(ArraySample):
         self.time_analysis.compute_analysis(self.get_sample())
 
 
-    def extend(self, other):
+    def extend(self, other, skip_existing_runs= False):
         assert isinstance(other, ArrayExecutionTime), f"Expected ArrayExecutionTime, got {type(other)}"
         
         assert self.get_creation_arguments() == other.get_creation_arguments(), f"Other measurement data comes from an array with different creation arguments, expected {self.get_creation_arguments().__str__()}, got {other.get_creation_arguments().__str__()}"
 
 
-        for execution_chunk in other.get_sample():
-            if execution_chunk in self.get_sample():
+        # one raw run for each run: runs measured without fresh input have NaN raw times
+        other_raw_execution_times = other.get_raw_execution_times()
+        if self.raw_execution_times is None and other_raw_execution_times is not None:
+            self.raw_execution_times = [[np.nan]*len(execution_chunk) for execution_chunk in self.get_sample()]
+
+        run_ids = self.get_run_ids()
+        added_runs = 0
+        for run, execution_chunk in enumerate(other.get_sample()):
+            run_id = execution_run_id(execution_chunk)
+            if run_id in run_ids:
+                if skip_existing_runs:
+                    continue
                 raise ValueError(f"Error: same execution times detected in:\n{str(self)}")
-            else:
-                self.get_sample().append(execution_chunk)
+            raw_chunk = other_raw_execution_times[run] if other_raw_execution_times is not None else [np.nan]*len(execution_chunk)
+            self.add_run(execution_chunk, raw_chunk)
+            added_runs += 1
+
+        # every run was already present: the measurements of the other runs are not counted twice
+        if not added_runs:
+            return
+
+        if self.operation_counts is None and other.get_operation_counts() is not None:
+            self.operation_counts = other.get_operation_counts()
+
+        if other.get_memory_usage() is not None:
+            self.memory_usage = (self.memory_usage or []) + other.get_memory_usage()
         
 
+    def add_run(self, execution_chunk, raw_execution_chunk= None):
+        """
+        Appends a run of execution times keeping the run ids and an already computed analysis up to date.
+        """
+        self.get_sample().append(execution_chunk)
+        if raw_execution_chunk is not None and self.raw_execution_times is not None:
+            self.raw_execution_times.append(raw_execution_chunk)
+        if self.run_ids is not None:
+            self.run_ids.add(execution_run_id(execution_chunk))
+            self.run_ids_count = len(self.get_sample())
+        # an analysis already computed is kept up to date with the new run only
+        if self.time_analysis.is_incremental():
+            self.time_analysis.update(execution_chunk)
+
+    def get_run_ids(self):
+        # computed again whenever the runs were changed without add_run
+        if self.run_ids is None or self.run_ids_count != len(self.get_sample()):
+            self.run_ids = {execution_run_id(execution_chunk) for execution_chunk in self.get_sample()}
+            self.run_ids_count = len(self.get_sample())
+        return self.run_ids
+
+    def get_raw_execution_times(self):
+        return self.raw_execution_times
+
+    def get_operation_counts(self):
+        return self.operation_counts
+
+    def get_mean_operation_counts(self):
+        if not self.operation_counts:
+            return None
+        return {operation: float(np.mean([counts[operation] for counts in self.operation_counts])) for operation in self.operation_counts[0]}
+
+    def get_memory_usage(self):
+        return self.memory_usage
+
+    def get_max_memory_usage(self):
+        if not self.memory_usage:
+            return None
+        metrics = {}
+        for usage in self.memory_usage:
+            for metric, value in usage.items():
+                if value is not None:
+                    metrics[metric] = max(metrics.get(metric, 0), value)
+        return metrics
+
     def get_time_analysis(self):
         return self.time_analysis
 
@@ -667,3 +1171,254 @@ class FoldersDataStorage(BaseDataDictionary):
 
     def get_by_folder(self, folder_path):
         return self.data[folder_path]
+
+
+
+class ColumnarExecutionTimeStorage:
+    """
+    Columnar counterpart of ExecutionTimeDataStorage: every measured execution time is a row of a structured
+    NumPy array with the columns
+        algorithm, folder, variability, n, m, dtype, rep_index, run_id, seconds, raw_seconds, creation_arguments
+    where algorithm, folder, dtype and creation_arguments are dictionary encoded (integer codes into `categories`),
+    raw_seconds is NaN when the copy-overhead raw time was not measured and run_id identifies the measurement run.
+
+    Main methods:
+        - update(algorithm, array_folder, execution_times): appends a list of ArrayExecutionTime as new runs.
+        - merge(other): appends the rows of another columnar storage (or ExecutionTimeDataStorage) as new runs.
+        - group_statistics(by): vectorized count, mean, sd and quantiles of `seconds` grouped by columns.
+        - fit_power_law(algorithm, array_folder=None): least squares fit of seconds = c * n^a * m^b.
+        - get_execution_times(algorithm, array_folder=None): same result of ExecutionTimeDataStorage.get_execution_times.
+        - to_execution_time_storage(): converts back to ExecutionTimeDataStorage.
+        - save(path) / load(path): '.npz' file without pickle.
+    """
+
+    CATEGORICAL_COLUMNS = ["algorithm", "folder", "dtype", "creation_arguments"]
+    ROW_DTYPE = np.dtype([
+        ("algorithm", np.int32),
+        ("folder", np.int32),
+        ("variability", np.int64),
+        ("n", np.int64),
+        ("m", np.int64),
+        ("dtype", np.int32),
+        ("rep_index", np.int32),
+        ("run_id", np.int64),
+        ("seconds", np.float64),
+        ("raw_seconds", np.float64),
+        ("creation_arguments", np.int32)
+    ])
+    QUANTILE_LEVELS = [0.01, 0.25, 0.5, 0.75, 0.99]
+    # variability of the rows of (n, m) grid keys, the key is rebuilt from the n and m columns
+    GRID_VARIABILITY = -1
+
+    def __init__(self, rows= None, categories= None):
+        self.rows = np.empty(0, dtype=self.ROW_DTYPE) if rows is None else rows
+        self.categories = categories or {column: [] for column in self.CATEGORICAL_COLUMNS}
+        self._codes = {column: {value: code for code, value in enumerate(values)} for column, values in self.categories.items()}
+
+    @classmethod
+    def from_execution_time_storage(cls, execution_time_storage):
+        columnar_storage = cls()
+        columnar_storage.merge(execution_time_storage)
+        return columnar_storage
+
+    def _encode(self, column, value):
+        codes = self._codes[column]
+        if value not in codes:
+            codes[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return codes[value]
+
+    def _next_run_id(self):
+        return int(self.rows["run_id"].max()) + 1 if len(self.rows) else 0
+
+    def update(self, algorithm, array_folder, execution_times):
+        run_id_offset = self._next_run_id()
+        new_rows = []
+        for execution_time in execution_times:
+            creation_arguments = execution_time.get_creation_arguments()
+            raw_execution_times = execution_time.get_raw_execution_times()
+            row_prefix = (
+                self._encode("algorithm", algorithm),
+                self._encode("folder", array_folder),
+                self.GRID_VARIABILITY if isinstance(execution_time.get_variability(), tuple) else execution_time.get_variability(),
+                creation_arguments.get_length(),
+                creation_arguments.get_number_variability(),
+                self._encode("dtype", str(creation_arguments.get_data_type()))
+            )
+            creation_arguments_code = self._encode("creation_arguments", json.dumps(creation_arguments.to_dict(as_json=True)))
+
+            for run, execution_chunk in enumerate(execution_time.get_sample()):
+                # execution times merged before raw times were kept aligned may miss the raw times of their last runs
+                raw_chunk = raw_execution_times[run] if raw_execution_times is not None and run < len(raw_execution_times) else [np.nan]*len(execution_chunk)
+                for rep_index, (seconds, raw_seconds) in enumerate(zip(execution_chunk, raw_chunk)):
+                    new_rows.append(row_prefix + (rep_index, run_id_offset + run, seconds, raw_seconds, creation_arguments_code))
+
+        self.rows = np.concatenate([self.rows, np.array(new_rows, dtype=self.ROW_DTYPE)])
+
+    def merge(self, other):
+        assert isinstance(other, (ColumnarExecutionTimeStorage, ExecutionTimeDataStorage, dict)), \
+            f"Expected ColumnarExecutionTimeStorage, ExecutionTimeDataStorage or dictionary, got {type(other)}"
+
+        if not isinstance(other, ColumnarExecutionTimeStorage):
+            if isinstance(other, dict):
+                other = ExecutionTimeDataStorage(other)
+            for algorithm, folders in other.items():
+                for folder, execution_times in folders.items():
+                    self.update(algorithm, folder, execution_times)
+            return
+
+        other_rows = other.rows.copy()
+        # remaps the dictionary codes of the other storage on the current ones
+        for column in self.CATEGORICAL_COLUMNS:
+            remap = np.array([self._encode(column, value) for value in other.categories[column]], dtype=np.int32)
+            if len(other_rows):
+                other_rows[column] = remap[other_rows[column]]
+        other_rows["run_id"] += self._next_run_id()
+        self.rows = np.concatenate([self.rows, other_rows])
+
+    def decode(self, column, codes):
+        return np.asarray(self.categories[column], dtype=object)[codes]
+
+    def group_statistics(self, by=("algorithm", "folder", "variability")):
+        """
+        Vectorized count, mean, sd (ddof=1) and quantiles (linear interpolation, as np.quantile) of `seconds`
+        for each group of rows sharing the values of the `by` columns.
+        Returns a dict with 'keys' (structured array of the group values, categorical columns decoded),
+        'count', 'mean', 'sd' and 'quantiles' {level: values}.
+        """
+
+        by = list(by)
+        group_keys, group_index = np.unique(self.rows[by], return_inverse=True)
+        group_index = group_index.ravel()
+        seconds = self.rows["seconds"]
+
+        count = np.bincount(group_index, minlength=len(group_keys))
+        mean = np.bincount(group_index, weights=seconds, minlength=len(group_keys)) / count
+        squared_deviations = np.bincount(group_index, weights=(seconds - mean[group_index])**2, minlength=len(group_keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sd = np.sqrt(squared_deviations / (count - 1))
+
+        # rows sorted by group and then by seconds: each group is a sorted contiguous segment
+        sorted_seconds = seconds[np.lexsort((seconds, group_index))]
+        group_start = np.concatenate([[0], np.cumsum(count)[:-1]])
+        quantiles = {}
+        for level in self.QUANTILE_LEVELS:
+            position = level * (count - 1)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            fraction = position - lower
+            quantiles[level] = sorted_seconds[group_start + lower] * (1 - fraction) + sorted_seconds[group_start + upper] * fraction
+
+        keys = {}
+        for column in by:
+            keys[column] = self.decode(column, group_keys[column]) if column in self.CATEGORICAL_COLUMNS else group_keys[column]
+        return {"keys": keys, "count": count, "mean": mean, "sd": sd, "quantiles": quantiles}
+
+    def fit_power_law(self, algorithm, array_folder= None):
+        """
+        Fits the cost model seconds = c * n^a * m^b by least squares on the logarithm of the mean time of every (n, m),
+        over the rows of `algorithm` (and of `array_folder` if specified). A dimension that never varies gets exponent 0.
+        Returns a dict with 'coefficient' (c), 'n_exponent' (a), 'm_exponent' (b) and 'r_squared'.
+        """
+
+        rows = self.rows[self.rows["algorithm"] == self._codes["algorithm"][algorithm]]
+        if array_folder is not None:
+            rows = rows[rows["folder"] == self._codes["folder"][array_folder]]
+        assert len(rows), f"No execution times of {algorithm} found."
+
+        group_keys, group_index = np.unique(rows[["n", "m"]], return_inverse=True)
+        group_index = group_index.ravel()
+        mean = np.bincount(group_index, weights=rows["seconds"]) / np.bincount(group_index)
+
+        log_n, log_m, log_seconds = np.log(group_keys["n"]), np.log(group_keys["m"]), np.log(mean)
+        varying = [np.ptp(log_n) > 0, np.ptp(log_m) > 0]
+        design = np.column_stack([np.ones(len(mean))] + [column for column, vary in zip([log_n, log_m], varying) if vary])
+        solution = np.linalg.lstsq(design, log_seconds, rcond=None)[0]
+
+        exponents = iter(solution[1:])
+        residuals = log_seconds - design @ solution
+        total = ((log_seconds - log_seconds.mean())**2).sum()
+        return {
+            "coefficient": float(np.exp(solution[0])),
+            "n_exponent": float(next(exponents)) if varying[0] else 0.0,
+            "m_exponent": float(next(exponents)) if varying[1] else 0.0,
+            "r_squared": float(1 - (residuals**2).sum() / total) if total > 0 else 1.0
+        }
+
+    def _build_execution_times(self, rows):
+        execution_times = []
+        groups = {}
+        for row in rows:
+            variability = (int(row["n"]), int(row["m"])) if row["variability"] == self.GRID_VARIABILITY else int(row["variability"])
+            groups.setdefault(variability, []).append(row)
+
+        for variability, group_rows in groups.items():
+            creation_arguments = ArraySampleCreationArguments(**json.loads(self.categories["creation_arguments"][group_rows[0]["creation_arguments"]]))
+            runs = {}
+            for row in group_rows:
+                runs.setdefault(int(row["run_id"]), []).append(row)
+
+            chunks, raw_chunks = [], []
+            for run_id in sorted(runs):
+                run_rows = sorted(runs[run_id], key=lambda row: row["rep_index"])
+                chunks.append([float(row["seconds"]) for row in run_rows])
+                raw_chunks.append([float(row["raw_seconds"]) for row in run_rows])
+            # raw times are kept when at least a run was measured with fresh input (NaN for the other runs)
+            has_raw = not all(np.isnan(raw_chunk).all() for raw_chunk in raw_chunks)
+
+            execution_time = ArrayExecutionTime(
+                execution_times = [chunks[0]],
+                creation_arguments = creation_arguments,
+                variability = variability,
+                raw_execution_times = [raw_chunks[0]] if has_raw else None
+            )
+            for chunk, raw_chunk in zip(chunks[1:], raw_chunks[1:]):
+                execution_time.add_run(chunk, raw_chunk if has_raw else None)
+            execution_times.append(execution_time)
+
+        return execution_times
+
+    def get_execution_times(self, algorithm, array_folder= None, raise_error_if_not_exists= True):
+        if algorithm not in self._codes["algorithm"]:
+            if raise_error_if_not_exists:
+                raise ValueError(f"Key {algorithm} not found in current execution data storage.")
+            return [] if array_folder is not None else {}
+
+        algorithm_rows = self.rows[self.rows["algorithm"] == self._codes["algorithm"][algorithm]]
+        if array_folder is not None:
+            if array_folder not in self._codes["folder"] and raise_error_if_not_exists:
+                raise ValueError(f"Key {array_folder} not found in current execution data storage.")
+            return self._build_execution_times(algorithm_rows[algorithm_rows["folder"] == self._codes["folder"].get(array_folder, -1)])
+
+        return {
+            self.categories["folder"][folder_code]: self._build_execution_times(algorithm_rows[algorithm_rows["folder"] == folder_code])
+            for folder_code in dict.fromkeys(algorithm_rows["folder"].tolist())
+        }
+
+    def keys(self):
+        return [self.categories["algorithm"][code] for code in dict.fromkeys(self.rows["algorithm"].tolist())]
+
+    def __getitem__(self, algorithm):
+        return self.get_execution_times(algorithm)
+
+    def __contains__(self, algorithm):
+        return algorithm in self.keys()
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_execution_time_storage(self):
+        return ExecutionTimeDataStorage({algorithm: self.get_execution_times(algorithm) for algorithm in self.keys()})
+
+    def save(self, path):
+        if not path.endswith(COLUMNAR_EXTENSION):
+            path += COLUMNAR_EXTENSION
+        # an interrupted write never leaves a truncated file
+        with ArrayStorageCompressor.atomic_open(path) as file:
+            np.savez(file, rows=self.rows, categories=np.array(json.dumps(self.categories)))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(rows=data["rows"], categories=json.loads(str(data["categories"])))
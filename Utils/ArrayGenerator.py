@@ -2,13 +2,15 @@ import numpy as np
 import os
 import random
 import fnmatch
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 from Utils import ArraySettings
 from Utils import ArrayStorageCompressor
 from Utils import ArrayDataManager
 
 
-ARRAY_GENERATION_FILE = "generation_params.json"
+ARRAY_GENERATION_FILE = ArraySettings.ARRAY_GENERATION_FILE_NAME
 
 # Function that creates a random array using a default numpy random generator
 # Input:
@@ -24,40 +26,213 @@ def initialize_array(n, m, dtype, seed):
 
 
 
-# Function that creates a list of random arrays using a default numpy random generator
+# Function that creates the random generators of the repetitions of a sample
+# Input:
+#     rep = number of repetitions,
+#     seeds = recorded seeds of the sample (default = None, fresh entropy),
+#     seeding = ArraySettings.SPAWNED_SEEDING or None (see ArraySettings.ARRAY_SEEDING)
+# Ouput:
+#     list of 'rep' independent numpy generators
+def repetition_generators(rep, seeds= None, seeding= None):
+    if seeding == ArraySettings.SPAWNED_SEEDING:
+        seed_sequence = np.random.SeedSequence(None if seeds is None else [int(seed) for seed in seeds])
+        return [np.random.default_rng(child) for child in seed_sequence.spawn(rep)]
+    if seeds is None:
+        seeds = [None for _ in range(rep)]
+    return [np.random.default_rng(None if seed is None else int(seed)) for seed in seeds[:rep]]
+
+
+
+# Functions that fill a row with the numbers of a distribution in [offset, offset + m), starting from uniform numbers already in the row
+# Input:
+#     row = array to be filled in place,
+#     m = Numbers variability,
+#     rng = numpy generator of the repetition,
+#     parameter = parameter of the distribution (see ArraySettings.DEFAULT_DISTRIBUTION_PARAMETERS),
+#     offset = lowest number of the range
+def _sorted_distribution(row, m, rng, parameter, offset):
+    row.sort()
+
+def _reverse_distribution(row, m, rng, parameter, offset):
+    row.sort()
+    row[:] = row[::-1]
+
+def _k_sorted_distribution(row, m, rng, parameter, offset):
+    row.sort()
+    ## disjoint pairs of positions: an index repeated among the swaps would lose or duplicate values
+    swaps = min(int(round(parameter * len(row))), len(row) // 2)
+    i, j = rng.permutation(len(row))[:2 * swaps].reshape(2, -1)
+    row[i], row[j] = row[j], row[i]
+
+def _zipf_distribution(row, m, rng, parameter, offset):
+    ## bounded Zipf: value k in [0, m) with probability proportional to 1/(k+1)^s, by inversion of the cumulative distribution
+    cumulative = np.cumsum(np.arange(1, m + 1, dtype=np.float64) ** -parameter)
+    np.copyto(row, np.searchsorted(cumulative, rng.random(len(row)) * cumulative[-1], side="right").clip(0, m - 1) + offset, casting="unsafe")
+
+def _gaussian_distribution(row, m, rng, parameter, offset):
+    values = np.rint(rng.normal((m - 1) / 2, m / parameter, size=len(row))).clip(0, m - 1)
+    np.copyto(row, values + offset, casting="unsafe")
+
+def _sawtooth_distribution(row, m, rng, parameter, offset):
+    run_length = max(1, -(-len(row) // max(1, int(parameter))))
+    np.copyto(row, (np.arange(len(row)) % run_length) * m // run_length + offset, casting="unsafe")
+
+def _organ_pipe_distribution(row, m, rng, parameter, offset):
+    half = -(-len(row) // 2)
+    ascending = np.arange(half) * m // half + offset
+    np.copyto(row, np.concatenate([ascending, ascending[:len(row) - half][::-1]]), casting="unsafe")
+
+def _equal_distribution(row, m, rng, parameter, offset):
+    row[:] = row[0]
+
+## distributions of the numbers of the arrays, None and "uniform" keep the uniform numbers
+DISTRIBUTIONS = {
+    "uniform": None,
+    "sorted": _sorted_distribution,
+    "reverse": _reverse_distribution,
+    "ksorted": _k_sorted_distribution,
+    "zipf": _zipf_distribution,
+    "gaussian": _gaussian_distribution,
+    "sawtooth": _sawtooth_distribution,
+    "organpipe": _organ_pipe_distribution,
+    "equal": _equal_distribution
+}
+
+
+
+# Function that creates a list of random arrays, all the repetitions are written in a single (rep, n) buffer
 # Input:
 #     n = Length of array,
 #     m = Numbers variability,
 #     rep = number of arrays in list (default = 1), 
-#     dtype = type of generated numbers (default = np.int64)
+#     dtype = type of generated numbers (default = np.int64),
+#     seeds = recorded seeds of the sample (default = None),
+#     seeding = see repetition_generators (default = None, one generator per seed drawing int64 numbers),
+#     distribution = name of one of DISTRIBUTIONS (default = None, uniform numbers),
+#     distribution_parameter = parameter of the distribution (default = None, see ArraySettings.DEFAULT_DISTRIBUTION_PARAMETERS),
+#     offset = lowest number of the range, numbers are drawn in [offset, offset + m) (default = None, 0),
+#     out = preallocated (rep, n) buffer of type 'dtype', e.g. a slice of a np.memmap (default = None, allocated here)
 # Ouput:
-#     random interger array with size 'n' and number variability of 'm' as type of 'dtype'
-def sample(n, m, rep = 1, dtype= np.int64, seeds= None):
-    if seeds is None:
-        seeds = [None for _ in range(rep)]
-    arraysGeneated = []
-    for i in range(rep):
-        currentGeneratedArray = initialize_array(n, m, dtype, seeds[i])
-        arraysGeneated.append(currentGeneratedArray)
+#     list of 'rep' random arrays with size 'n' and number variability of 'm' as type of 'dtype' (rows of 'out'),
+#     floating point dtypes are filled with uniform real numbers of the same range
+def sample(n, m, rep = 1, dtype= np.int64, seeds= None, seeding= None, distribution= None, distribution_parameter= None, offset= None, out= None):
+    dtype = np.dtype(dtype)
+    offset = offset or 0
+    if distribution is not None and distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution {distribution}, expected one of {list(DISTRIBUTIONS.keys())}")
+    shape = DISTRIBUTIONS.get(distribution)
+    if distribution_parameter is None:
+        distribution_parameter = ArraySettings.DEFAULT_DISTRIBUTION_PARAMETERS.get(distribution)
+
+    if out is None:
+        out = np.empty((rep, n), dtype=dtype)
+    assert out.shape == (rep, n) and out.dtype == dtype, f"Expected a ({rep}, {n}) {dtype} buffer, got a {out.shape} {out.dtype} one"
+
+    for row, rng in zip(out, repetition_generators(rep, seeds, seeding)):
+        if dtype.kind == "f":
+            np.copyto(row, rng.random(n) * m + offset, casting="unsafe")
+        elif seeding == ArraySettings.SPAWNED_SEEDING:
+            row[:] = rng.integers(offset, offset + m, size=n, dtype=dtype)
+        else:
+            # same numbers of initialize_array, cast while copied into the buffer
+            np.copyto(row, rng.integers(offset, offset + m, size=n), casting="unsafe")
+        if shape is not None:
+            shape(row, m, rng, distribution_parameter, offset)
+
+    return list(out)
+
+
+
+# Function that creates the samples of many creation arguments, optionally with a pool of threads
+# (numpy generators release the GIL while drawing numbers)
+# Input:
+#     creation_arguments_list = list of ArraySampleCreationArguments,
+#     outs = list of preallocated buffers, one per creation arguments (default = None, see sample),
+#     workers = number of generation threads (default = 1)
+# Output:
+#     list of samples, in the same order of creation_arguments_list
+def sample_many(creation_arguments_list, outs= None, workers= 1):
+    if outs is None:
+        outs = [None for _ in creation_arguments_list]
+    generate = lambda creation_arguments, out: sample(**creation_arguments.to_dict(), out= out)
+
+    if workers is None or workers <= 1:
+        return [generate(creation_arguments, out) for creation_arguments, out in zip(creation_arguments_list, outs)]
+    with ThreadPoolExecutor(max_workers= workers) as executor:
+        return list(executor.map(generate, creation_arguments_list, outs))
+
+
+
+# Function that generates the arrays of a container directly into a memory mapped storage
+# (same layout of ArrayDataManager.write_memory_mapped_storage), without holding them in memory
+# Input:
+#     array_sample_container = ArraySampleContainer, only the creation arguments of its samples are used,
+#     path = path of the '.mmap' index file,
+#     workers = number of generation threads (default = 1)
+# Output:
+#     path of the written index file
+def generate_memory_mapped_storage(array_sample_container, path, workers= 1):
+    if path.endswith(ArrayStorageCompressor.MEMORY_MAP_EXTENSION):
+        path = path[:-len(ArrayStorageCompressor.MEMORY_MAP_EXTENSION)]
+    folder, name = os.path.split(path)
 
-    return arraysGeneated
+    index = {"buffers": {}, "samples": {}}
+    buffer_sizes = {}
+    creation_arguments_list = []
+    for key in array_sample_container.keys(toSort=True):
+        creation_arguments = array_sample_container.get(key).get_creation_arguments()
+        dtype = np.dtype(creation_arguments.get_data_type())
+        index["buffers"].setdefault(dtype.name, name + "." + dtype.name + ArrayStorageCompressor.RAW_EXTENSION)
+        index["samples"][ArrayDataManager.variability_key_to_str(key)] = {
+            "dtype": dtype.name,
+            "offset": buffer_sizes.get(dtype.name, 0),
+            "length": creation_arguments.get_length(),
+            "rep": creation_arguments.get_repetitions(),
+            "creation_arguments": creation_arguments.to_dict(as_json=True)
+        }
+        buffer_sizes[dtype.name] = buffer_sizes.get(dtype.name, 0) + creation_arguments.get_length() * creation_arguments.get_repetitions() * dtype.itemsize
+        creation_arguments_list.append(creation_arguments)
 
+    buffers = {
+        dtype_name: np.memmap(os.path.join(folder, buffer_name), dtype=np.uint8, mode="w+", shape=(max(buffer_sizes[dtype_name], 1),))
+        for dtype_name, buffer_name in index["buffers"].items()
+    }
+    outs = []
+    for entry in index["samples"].values():
+        size = entry["length"] * entry["rep"] * np.dtype(entry["dtype"]).itemsize
+        outs.append(buffers[entry["dtype"]][entry["offset"]:entry["offset"] + size].view(entry["dtype"]).reshape(entry["rep"], entry["length"]))
 
-def setup_parameter_builder_environment():
+    sample_many(creation_arguments_list, outs, workers)
+    for buffer in buffers.values():
+        buffer.flush()
+    del outs, buffers
+
+    return ArrayStorageCompressor.writeOnFile(index, path + ArrayStorageCompressor.MEMORY_MAP_EXTENSION, return_file_path=True, as_json=True)
+
+
+# Function that creates the builder of the creation arguments of each variability key
+# Input:
+#     profile = ArraySettings.VariabilityProfile of the run (default = None, module settings)
+# Output:
+#     function (index, key) -> ArraySampleCreationArguments with fresh seeds, never repeated by the same builder
+def setup_parameter_builder_environment(profile= None):
     used_seeds = []
+    creation_arguments = profile.creation_arguments if profile else ArraySettings.CREATION_ARRAY_ARGUMENTS
+    creation_seed = profile.creation_seed if profile else ArraySettings.CREATION_DETERMINISTIC_SEED
+    variability_key_number = profile.variability_key_number if profile else ArraySettings.VARIABILITY_KEY_NUMBER
 
     def build_array_parameters(index, param_value, seed_pool):
-        builder = ArraySettings.CREATION_ARRAY_ARGUMENTS(param_value)
+        builder = creation_arguments(param_value)
         rep = builder.to_dict()["rep"]
 
         for r in range(rep):
-            seed = ArraySettings.CREATION_DETERMINISTIC_SEED(param_value, index, r)
+            seed = creation_seed(param_value, index, r)
 
             if seed in seed_pool:
                 print(f"[Warning] Seed {seed} already used at iteration {index}.")
                 t = 1
                 while seed in seed_pool:
-                    seed = ArraySettings.CREATION_DETERMINISTIC_SEED(param_value + 3*index + 5*(index + t), index, r)
+                    seed = creation_seed(variability_key_number(param_value) + 3*index + 5*(index + t), index, r)
                     t += 1
 
             seed_pool.append(seed)
@@ -68,6 +243,45 @@ def setup_parameter_builder_environment():
     return lambda index, param_value, seed_pool=used_seeds: build_array_parameters(index, param_value, seed_pool)
 
 
+# Function that creates a new storage folder of a variability profile with its generation parameters file
+# Input:
+#     profile = ArraySettings.VariabilityProfile of the run (default = None, ArraySettings.DEFAULT_PROFILE)
+# Output:
+#     path of the generation parameters file, its arrays are generated by generate_array_by_generation_files
+def create_generation_file(profile= None):
+    profile = profile or ArraySettings.DEFAULT_PROFILE
+    parameter_builder = setup_parameter_builder_environment(profile)
+    generation_arguments = {
+        ArrayDataManager.variability_key_to_str(key): parameter_builder(index, key).to_dict(as_json= True)
+        for index, key in enumerate(profile.keys())
+    }
+    generation_file_path = os.path.join(profile.create_array_storage_folder(), ARRAY_GENERATION_FILE)
+    ArrayStorageCompressor.writeOnFile(generation_arguments, generation_file_path, as_json= True)
+    return generation_file_path
+
+
+# Function that loads a storage folder without its array files
+# Input:
+#     generation_file_path = path of the generation parameters file of the storage folder
+# Output:
+#     ArraySampleContainer of VirtualArraySample, arrays are regenerated from the recorded seeds only when requested
+def load_virtual_sample_container(generation_file_path):
+    array_sample_container_arguments_json = ArrayStorageCompressor.readFromFile(generation_file_path, as_json= True)
+
+    sample_container = ArrayDataManager.ArraySampleContainer()
+    for variability_key, creation_arguments in array_sample_container_arguments_json.items():
+        sample_container.update(
+            {
+            ArrayDataManager.parse_variability_key(variability_key):
+                ArrayDataManager.VirtualArraySample(
+                    creation_arguments = ArrayDataManager.ArraySampleCreationArguments(**creation_arguments),
+                    variability = ArrayDataManager.parse_variability_key(variability_key)
+                )
+            }
+        )
+    return sample_container
+
+
 def find_file(filename, search_root):
     matches = []
 
@@ -80,13 +294,85 @@ def find_file(filename, search_root):
 
 
 
+# Function that generates the arrays of a chunk and saves them on a single file
+# Input:
+#     chunk = ArraySampleContainer, only the creation arguments of its samples are used,
+#     file_path = destination file path,
+#     memmap = saves the chunk as a memory mapped storage (default = False),
+#     compress = compresses the pickled chunk (default = False),
+#     threads = number of generation threads (default = 1),
+#     codec, level = compression codec extension and level preset (default = None, see ArrayStorageCompressor)
+# Output:
+#     number of generated bytes
+def save_generated_chunk(chunk, file_path, memmap= False, compress= False, threads= 1, codec= None, level= None):
+    if memmap:
+        generate_memory_mapped_storage(chunk, file_path, workers= threads)
+    else:
+        array_samples = list(chunk.get_samples())
+        generated_samples = sample_many([array_sample.get_creation_arguments() for array_sample in array_samples], workers= threads)
+        for array_sample, generated_sample in zip(array_samples, generated_samples):
+            array_sample.sample = generated_sample
+        ArrayStorageCompressor.writeOnFile(
+            data = chunk,
+            path = file_path,
+            compress = compress,
+            codec = codec,
+            level = level
+        )
+        # Releases the arrays of the chunk before generating the next one
+        for array_sample in array_samples:
+            array_sample.sample = []
+
+    return sum(
+        array_sample.get_creation_arguments().get_length() * array_sample.get_creation_arguments().get_repetitions() * np.dtype(array_sample.get_creation_arguments().get_data_type()).itemsize
+        for array_sample in chunk.get_samples()
+    )
+
+
+
+# Function that generates and saves a chunk described by json creation arguments, it is the unit of work
+# of the --jobs mode (arguments and results are cheap to send to and from a worker process)
+# Input:
+#     generation_file_path = generation file the chunk comes from,
+#     file_path = destination file path,
+#     chunk_arguments = {variability key: creation arguments as json dictionary},
+#     memmap, compress, threads, codec, level = see save_generated_chunk
+# Output:
+#     (generation_file_path, file_path, generated bytes, start time, end time)
+def generate_chunk_file(generation_file_path, file_path, chunk_arguments, memmap= False, compress= False, threads= 1, codec= None, level= None):
+    start_time = time.time()
+    chunk = ArrayDataManager.ArraySampleContainer()
+    for variability_key, creation_arguments in chunk_arguments.items():
+        chunk.update(
+            {
+            ArrayDataManager.parse_variability_key(variability_key):
+                ArrayDataManager.ArraySample(
+                    sample = [],
+                    creation_arguments = ArrayDataManager.ArraySampleCreationArguments(**creation_arguments),
+                    variability = ArrayDataManager.parse_variability_key(variability_key)
+                )
+            }
+        )
+    generated_bytes = save_generated_chunk(chunk, file_path, memmap= memmap, compress= compress, threads= threads, codec= codec, level= level)
+    return generation_file_path, file_path, generated_bytes, start_time, time.time()
+
+
+
 def generate_array_by_generation_files(file_paths, args):
     destination_folder = args.output
-    extension = ArrayStorageCompressor.COMPRESS_EXTENSION if args.compress else ArrayStorageCompressor.PICKABLE_EXTENSION
+    if args.memmap and args.compress:
+        raise ValueError("You cannot use compression and memory mapped storage at the same time.")
+    if args.memmap:
+        extension = ArrayStorageCompressor.MEMORY_MAP_EXTENSION
+    else:
+        extension = ArrayStorageCompressor.get_codec(args.codec).extension if args.compress else ArrayStorageCompressor.PICKABLE_EXTENSION
     
     if destination_folder and not os.path.isdir(destination_folder):
         raise FileNotFoundError(f"Selected destination folder was not found.")
     
+    # every chunk file of every generation file is planned before generating anything
+    chunk_jobs = []
+    planned_file_paths = {}
     file_generated_index = 0 if args.number > 1 else ""
     for generation_file_path in file_paths:
         if not args.output:
@@ -102,51 +388,74 @@ def generate_array_by_generation_files(file_paths, args):
                 print(f"Warning: Files detected in {destination_folder}, folder skipped.")
                 continue
 
-        print(f"Reading creation file at: {generation_file_path}\n")
+        print(f"Reading creation file at: {generation_file_path}")
         array_sample_container_arguments_json = ArrayStorageCompressor.readFromFile(generation_file_path, as_json= True)
 
-        print(f"Generation of sample arrays...")
+        # samples without arrays: each chunk is generated only when it is saved
         sample_container = ArrayDataManager.ArraySampleContainer()
         for variability_key, creation_arguments in array_sample_container_arguments_json.items():
-            sample_creation_arguments = ArrayDataManager.ArraySampleCreationArguments(**creation_arguments)
             sample_container.update(
                 {
-                int(variability_key): 
+                ArrayDataManager.parse_variability_key(variability_key): 
                     ArrayDataManager.ArraySample(
-                        sample = sample(**sample_creation_arguments.to_dict()),
-                        creation_arguments = sample_creation_arguments,
-                        variability = int(variability_key)
+                        sample = [],
+                        creation_arguments = ArrayDataManager.ArraySampleCreationArguments(**creation_arguments),
+                        variability = ArrayDataManager.parse_variability_key(variability_key)
                     )
                 }
             )
         
-        chunked_sample_container = sample_container.subdivideArrayUniformly(args.number)
-        
-        print(f"Saving generated arrays at: {destination_folder}\n")
-        for chunk in chunked_sample_container:
+        for chunk in sample_container.subdivideArrayUniformly(args.number):
             file_name = args.prefix + str(file_generated_index) + extension
             
             file_path = os.path.join(destination_folder, file_name)
             
             if os.path.isfile(file_path) and not args.overwrite:
                 raise FileExistsError(f"Array file '{file_name}' already exists in {destination_folder}")
-                
-    
-            if args.overwrite:
+            
+            # e.g. more generation files saved in the same --output folder as a single file each
+            if os.path.abspath(file_path) in planned_file_paths:
+                raise FileExistsError(f"Array file '{file_path}' would be written by both {planned_file_paths[os.path.abspath(file_path)]} and {generation_file_path}, "
+                                      f"select a different output folder or more files (--number).")
+            planned_file_paths[os.path.abspath(file_path)] = generation_file_path
+
+            if args.overwrite and os.path.isfile(file_path):
                 print(f"Overwriting {file_path}")
-            else:
-                print(f"Generated {file_path}")
-                
-            ArrayStorageCompressor.writeOnFile(
-                data = chunk,
-                path = file_path,
-                compress = args.compress
-            )
-            print(f"Generated array chunk was saved in: {file_path}")
+
+            chunk_arguments = {ArrayDataManager.variability_key_to_str(key): array_sample.get_creation_arguments().to_dict(as_json=True) for key, array_sample in chunk.items()}
+            chunk_jobs.append((generation_file_path, file_path, chunk_arguments, args.memmap, args.compress, args.threads, args.codec, args.level))
             if args.number > 1:
                 file_generated_index += 1
-            
+    print()
+
+    # generated bytes, first start and last end time of each generation file
+    folder_statistics = {}
+    def collect(result):
+        generation_file_path, file_path, generated_bytes, start_time, end_time = result
+        print(f"Generated array chunk was saved in: {file_path} ({generated_bytes / 1024**2:.1f} MB, {generated_bytes / 1024**2 / max(end_time - start_time, 1e-9):.1f} MB/s)")
+        statistics = folder_statistics.setdefault(os.path.dirname(generation_file_path), [0, start_time, end_time])
+        statistics[0] += generated_bytes
+        statistics[1], statistics[2] = min(statistics[1], start_time), max(statistics[2], end_time)
+
+    if args.jobs > 1:
+        # chunks are generated and written by a pool of processes: compression and writing of a chunk
+        # overlap with the generation of the others
+        with ProcessPoolExecutor(max_workers= args.jobs) as executor:
+            futures = [executor.submit(generate_chunk_file, *chunk_job) for chunk_job in chunk_jobs]
+            for future in as_completed(futures):
+                collect(future.result())
+    else:
+        for chunk_job in chunk_jobs:
+            collect(generate_chunk_file(*chunk_job))
+
+    if folder_statistics:
         print()
+    for folder, (generated_bytes, start_time, end_time) in folder_statistics.items():
+        print(f"{folder}: {generated_bytes / 1024**2:.1f} MB in {end_time - start_time:.2f} s ({generated_bytes / 1024**2 / max(end_time - start_time, 1e-9):.1f} MB/s)")
+    if len(folder_statistics) > 1:
+        total_bytes = sum(statistics[0] for statistics in folder_statistics.values())
+        total_time = max(statistics[2] for statistics in folder_statistics.values()) - min(statistics[1] for statistics in folder_statistics.values())
+        print(f"Total: {total_bytes / 1024**2:.1f} MB in {total_time:.2f} s ({total_bytes / 1024**2 / max(total_time, 1e-9):.1f} MB/s)")
 
 
 
@@ -163,6 +472,11 @@ if __name__ == "__main__":
     parser.add_argument("-s", "--searchFolder", help="Folder from which to search the target file (used with --auto).", type=str, default=".")
     parser.add_argument("-w", "--overwrite", help="Overwrites any existing files.", action='store_true')
     parser.add_argument("-c", "--compress", help="Compress each generated file.", action='store_true')
+    parser.add_argument("--codec", help=f"Compression codec (used with --compress): {list(ArrayStorageCompressor.CODECS.keys())}.", type=str, default= ArrayStorageCompressor.DEFAULT_CODEC)
+    parser.add_argument("--level", help="Compression level preset (fast, default, max).", type=str, default= ArrayStorageCompressor.DEFAULT_LEVEL)
+    parser.add_argument("-m", "--memmap", help="Save each generated file as a memory mapped storage (json index + raw buffers).", action='store_true')
+    parser.add_argument("-t", "--threads", help="Number of threads generating the samples of a file.", type=int, default= 1)
+    parser.add_argument("-j", "--jobs", help="Number of processes generating and writing the files concurrently.", type=int, default= 1)
     
     args = parser.parse_args()
 
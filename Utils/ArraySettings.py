@@ -1,4 +1,5 @@
 import os
+import sys
 import numpy as np
 from datetime import datetime
 from enum import Enum
@@ -46,6 +47,26 @@ class Variability(Enum):
         )
     )
 
+    ## grid sweep: keys are (array length, value range) tuples, NUMBER_OF_SAMPLES values for each dimension
+    onGrid = dict(
+        code = "NM",
+        nice_name = "Array length × value range",
+        MINIMUN_ARRAY_LENGTH = 100,
+        MAXIMUM_ARRAY_LENGTH = 10**5,
+        MINIMUM_DIFFERENT_NUMBERS_IN_ARRAY = 10,
+        MAXIMUM_DIFFERENT_NUMBERS_IN_ARRAY = 10**6,
+        NUMBER_OF_SAMPLES = 10,
+        GRID = True,
+
+        ARRAY_START_KEY = "MINIMUN_ARRAY_LENGTH",
+        ARRAY_END_KEY = "MAXIMUM_ARRAY_LENGTH",
+        ## argument: (array length, array number variability)
+        CREATION_ARRAY_ARGUMENTS = lambda variability_key: ArrayDataManager.ArraySampleCreationArgumentsBuilder.builder_on_grid(
+            n = variability_key[0],
+            m = variability_key[1]
+        )
+    )
+
 ### ---- VARIABILITY CHANGE ----
 # change this in order to have variability on length of array or on the different numbers in array
 VARIABILITY = Variability.onLength
@@ -58,8 +79,8 @@ NUMBER_OF_REPETITIONS = 10
 MAIN_ARRAY_STORAGE_FOLDER_PATH = os.path.join("Array", "ArrayStorage", f"{VARIABILITY.value['code']}_variability")
 ARRAY_STORAGE_FOLDER_PREFIX = "storage_"
 
-def GET_ARRAY_STORAGE_FOLDER_PATH(folder_name=None, get_all=False):
-    main_storage_folder = MAIN_ARRAY_STORAGE_FOLDER_PATH
+def GET_ARRAY_STORAGE_FOLDER_PATH(folder_name=None, get_all=False, main_storage_folder=None):
+    main_storage_folder = main_storage_folder or MAIN_ARRAY_STORAGE_FOLDER_PATH
     folder_list = sorted(
         [
             f
@@ -79,12 +100,12 @@ def GET_ARRAY_STORAGE_FOLDER_PATH(folder_name=None, get_all=False):
 
     return [os.sep.join([main_storage_folder, selected_folder])]
 
-def GET_COMPRESSED_ARRAY_FILES_IN_STORAGE_FOLDER(storage_folders= None, get_all= False):
+def GET_COMPRESSED_ARRAY_FILES_IN_STORAGE_FOLDER(storage_folders= None, get_all= False, main_storage_folder= None):
     if storage_folders is None:
         storage_folders = [storage_folders]
     folders = []
     for folder in storage_folders:
-        f = GET_ARRAY_STORAGE_FOLDER_PATH(folder_name= folder, get_all= get_all)
+        f = GET_ARRAY_STORAGE_FOLDER_PATH(folder_name= folder, get_all= get_all, main_storage_folder= main_storage_folder)
         folders.extend(f)
     output = []
     for folder in folders:
@@ -96,14 +117,55 @@ def GET_COMPRESSED_ARRAY_FILES_IN_STORAGE_FOLDER(storage_folders= None, get_all=
             output.append(array_storage_file)
     return output
     
-def CREATE_ARRAY_STORAGE_FOLDER():
+## chunk files of each storage folder: '<GET_COMPRESSED_ARRAY_FILE_NAME>[<chunk number>]<extension>', ordered by chunk number
+def GET_ARRAY_CHUNK_FILES_IN_STORAGE_FOLDER(storage_folders= None, get_all= False, main_storage_folder= None):
+    if storage_folders is None:
+        storage_folders = [storage_folders]
+    folders = []
+    for folder in storage_folders:
+        folders.extend(GET_ARRAY_STORAGE_FOLDER_PATH(folder_name= folder, get_all= get_all, main_storage_folder= main_storage_folder))
+    output = {}
+    for folder in folders:
+        chunks = {}
+        for file_name in os.listdir(folder):
+            name, ext = os.path.splitext(file_name)
+            chunk_number = name[len(GET_COMPRESSED_ARRAY_FILE_NAME):]
+            if not name.startswith(GET_COMPRESSED_ARRAY_FILE_NAME) or ext not in ARRAY_ADMISSIBLE_EXTENSIONS:
+                continue
+            if chunk_number and not chunk_number.isdigit():
+                continue
+            chunk_number = int(chunk_number) if chunk_number else -1
+            ## same chunk saved with more formats: the first admissible extension wins
+            if chunk_number in chunks and ARRAY_ADMISSIBLE_EXTENSIONS.index(os.path.splitext(chunks[chunk_number])[1]) < ARRAY_ADMISSIBLE_EXTENSIONS.index(ext):
+                continue
+            chunks[chunk_number] = os.path.join(folder, file_name)
+        if chunks:
+            output[folder] = [chunks[chunk_number] for chunk_number in sorted(chunks)]
+    return output
+
+## generation parameters of a storage folder, enough to regenerate its arrays (see ArrayDataManager.VirtualArraySample)
+def GET_GENERATION_FILES_IN_STORAGE_FOLDER(storage_folders= None, get_all= False, main_storage_folder= None):
+    if storage_folders is None:
+        storage_folders = [storage_folders]
+    folders = []
+    for folder in storage_folders:
+        folders.extend(GET_ARRAY_STORAGE_FOLDER_PATH(folder_name= folder, get_all= get_all, main_storage_folder= main_storage_folder))
+    output = []
+    for folder in folders:
+        generation_file = os.path.join(folder, ARRAY_GENERATION_FILE_NAME)
+        if os.path.isfile(generation_file):
+            output.append(generation_file)
+    return output
+    
+def CREATE_ARRAY_STORAGE_FOLDER(main_storage_folder= None):
     path = os.sep.join([
-        MAIN_ARRAY_STORAGE_FOLDER_PATH,
+        main_storage_folder or MAIN_ARRAY_STORAGE_FOLDER_PATH,
         ARRAY_STORAGE_FOLDER_PREFIX + datetime.now().strftime("%Y-%m-%d_%H-%M-%S")])
     os.makedirs(path, exist_ok=False)
     return path
 
 GET_COMPRESSED_ARRAY_FILE_NAME = "ArrayStorage"
+ARRAY_GENERATION_FILE_NAME = "generation_params.json"
 
 
 MAX_ARRAY_SAVE_FILES = 1
@@ -124,15 +186,160 @@ ARRAY_END_KEY = VARIABILITY.value[VARIABILITY.value["ARRAY_END_KEY"]]
 MAX_NUMBER_IN_SAMPLER_RANGE = MAXIMUM_DIFFERENT_NUMBERS_IN_ARRAY -1 ## -1 because the zero is included
 MIN_NUMBER_IN_SAMPLER_RANGE = MINIMUM_DIFFERENT_NUMBERS_IN_ARRAY
 
-ARRAY_DATATYPE = ArrayCalculateTypes.calculateMinimumExpensiveArrayType(MAX_NUMBER_IN_SAMPLER_RANGE)
+## lowest number of the arrays: numbers are drawn in [ARRAY_NUMBERS_OFFSET, ARRAY_NUMBERS_OFFSET + m), a negative offset gives signed arrays
+ARRAY_NUMBERS_OFFSET = 0
+## unsigned datatypes when no number is negative (e.g. uint8 instead of int16 for numbers up to 255)
+ARRAY_UNSIGNED_DATATYPES = True
+## floating point arrays: uniform real numbers of the same range (float32 while every integer of the range is exact, float64 otherwise)
+ARRAY_FLOATING_POINT = False
+
+ARRAY_DATATYPE = ArrayCalculateTypes.calculateMinimumExpensiveArrayType(ARRAY_NUMBERS_OFFSET + MAX_NUMBER_IN_SAMPLER_RANGE, ARRAY_NUMBERS_OFFSET, ARRAY_UNSIGNED_DATATYPES, ARRAY_FLOATING_POINT)
+
+## seeding of the repetitions of a sample:
+##   None    -> one generator per recorded seed, numbers drawn as int64 and then cast (storages created before batched generation)
+##   "spawn" -> one stream per repetition spawned from a SeedSequence of the recorded seeds, numbers drawn directly in dtype
+SPAWNED_SEEDING = "spawn"
+ARRAY_SEEDING = SPAWNED_SEEDING
+
+## distribution of the numbers of each array (None -> uniform integers in [0, m)), see ArrayGenerator.DISTRIBUTIONS:
+##   "uniform", "sorted", "reverse", "ksorted" (sorted with random swaps), "zipf", "gaussian",
+##   "sawtooth", "organpipe" (ascending then descending), "equal" (all elements equal)
+## the optional parameter tunes it, DEFAULT_DISTRIBUTION_PARAMETERS is used when not specified
+ARRAY_DISTRIBUTION = None
+DEFAULT_DISTRIBUTION_PARAMETERS = {
+    "ksorted": 0.01,    # swapped pairs, as a fraction of the array length (at most half of it)
+    "zipf": 1.2,        # exponent s of P(k) ~ 1/(k+1)^s
+    "gaussian": 6,      # number of standard deviations covering the value range
+    "sawtooth": 8       # number of ascending runs
+}
 
 # argument order: array length, array number variability, array repetition based on VARIABILITY, dtype
 def CREATION_ARRAY_ARGUMENTS(variability_number):
     
-    builder = VARIABILITY.value["CREATION_ARRAY_ARGUMENTS"](variability_number).set_repetitions(NUMBER_OF_REPETITIONS).set_data_type(ARRAY_DATATYPE)
+    builder = VARIABILITY.value["CREATION_ARRAY_ARGUMENTS"](variability_number).set_repetitions(NUMBER_OF_REPETITIONS).set_data_type(ARRAY_DATATYPE).set_seeding(ARRAY_SEEDING).set_distribution(ARRAY_DISTRIBUTION, DEFAULT_DISTRIBUTION_PARAMETERS.get(ARRAY_DISTRIBUTION)).set_offset(ARRAY_NUMBERS_OFFSET)
     return builder
 
-CREATION_DETERMINISTIC_SEED = lambda key, index, repetition: int(100 + key * NUMBER_OF_REPETITIONS + index + repetition + (time.time()*1000) % 100000) % (2**32 - 1) 
+## number identifying a variability key in the seeds, (n, m) grid keys included:
+## m is at most maximum_different_numbers, so n * (maximum_different_numbers + 1) + m never collides
+VARIABILITY_KEY_NUMBER = lambda key, maximum_different_numbers= MAXIMUM_DIFFERENT_NUMBERS_IN_ARRAY: key[0] * (maximum_different_numbers + 1) + key[1] if isinstance(key, tuple) else key
+
+## seed of a repetition of a key, profiles pass their own key number and number of repetitions
+CREATION_DETERMINISTIC_SEED = lambda key, index, repetition, number_of_repetitions= NUMBER_OF_REPETITIONS: int(100 + VARIABILITY_KEY_NUMBER(key) * number_of_repetitions + index + repetition + (time.time()*1000) % 100000) % (2**32 - 1)
+
+
+class VariabilityProfile:
+    """
+    Variability settings of a single run, the run time counterpart of the module constants derived from VARIABILITY:
+    more profiles (e.g. N and M variability) can be used by the same process, each one with its own storage
+    and execution times folders.
+
+    Args:
+        variability (Variability or dict, optional): one of the Variability values or a custom dictionary with the
+            same keys (e.g. a sweep over both length and value range), `VARIABILITY` if not specified.
+        number_of_samples (int, optional): number of variability keys (of each dimension for grid sweeps).
+        number_of_repetitions (int, optional): number of arrays of each key.
+        seeding (str, optional): seeding of the repetitions, see ARRAY_SEEDING.
+        distribution (str, optional): distribution of the numbers of the arrays, see ARRAY_DISTRIBUTION.
+        distribution_parameter (float, optional): parameter of the distribution, see DEFAULT_DISTRIBUTION_PARAMETERS.
+        offset (int, optional): lowest number of the arrays, see ARRAY_NUMBERS_OFFSET.
+        unsigned (bool, optional): unsigned datatype when no number is negative, see ARRAY_UNSIGNED_DATATYPES.
+        floating_point (bool, optional): floating point arrays, see ARRAY_FLOATING_POINT.
+
+    Main methods:
+        - keys(): variability keys, geometric series from the start to the end key
+            ((n, m) tuples of the geometric series of both dimensions for grid sweeps).
+        - creation_arguments(variability_number): builder of the creation arguments of a key (see CREATION_ARRAY_ARGUMENTS).
+        - variability_key_number(key): number identifying a key in the seeds (see VARIABILITY_KEY_NUMBER).
+        - get_array_storage_folder_path / get_array_chunk_files / get_generation_files / create_array_storage_folder:
+            storage folder functions of this module bound to the profile storage folder.
+        - apply_recursion_limit(): raises the recursion limit to the longest array of the profile.
+    """
+
+    def __init__(self, variability= None, number_of_samples= None, number_of_repetitions= None, seeding= ARRAY_SEEDING,
+                 distribution= ARRAY_DISTRIBUTION, distribution_parameter= None,
+                 offset= ARRAY_NUMBERS_OFFSET, unsigned= ARRAY_UNSIGNED_DATATYPES, floating_point= ARRAY_FLOATING_POINT):
+        variability = VARIABILITY if variability is None else variability
+        self.variability = variability
+        self.settings = variability.value if isinstance(variability, Variability) else dict(variability)
+        self.number_of_samples = number_of_samples or self.settings.get("NUMBER_OF_SAMPLES", NUMBER_OF_SAMPLES)
+        self.number_of_repetitions = number_of_repetitions or NUMBER_OF_REPETITIONS
+        self.seeding = seeding
+        self.distribution = distribution
+        self.distribution_parameter = DEFAULT_DISTRIBUTION_PARAMETERS.get(distribution) if distribution_parameter is None else distribution_parameter
+        self.offset = offset
+
+        self.code = self.settings["code"]
+        self.grid = self.settings.get("GRID", False)
+        self.nice_name = self.settings["nice_name"]
+        self.minimum_array_length = self.settings["MINIMUN_ARRAY_LENGTH"]
+        self.maximum_array_length = self.settings["MAXIMUM_ARRAY_LENGTH"]
+        self.minimum_different_numbers = self.settings["MINIMUM_DIFFERENT_NUMBERS_IN_ARRAY"]
+        self.maximum_different_numbers = self.settings["MAXIMUM_DIFFERENT_NUMBERS_IN_ARRAY"]
+        self.array_start_key = self.settings[self.settings["ARRAY_START_KEY"]]
+        self.array_end_key = self.settings[self.settings["ARRAY_END_KEY"]]
+        self.data_type = ArrayCalculateTypes.calculateMinimumExpensiveArrayType(self.offset + self.maximum_different_numbers - 1, self.offset, unsigned, floating_point)
+
+        self.main_array_storage_folder_path = os.path.join("Array", "ArrayStorage", f"{self.code}_variability")
+        self.execution_times_folder = os.sep.join(["Benchmark", "ExecutionTimes", f"{self.code}_variability"])
+        self.execution_times_graph_folder = os.sep.join(["Report", "Charts", f"{self.code}_variability"])
+        self.recursion_limit = self.maximum_array_length + 1
+
+    @classmethod
+    def from_code(cls, code, **kwargs):
+        for variability in Variability:
+            if variability.value["code"] == code:
+                return cls(variability, **kwargs)
+        raise ValueError(f"Unknown variability {code}, expected one of {[variability.value['code'] for variability in Variability]}")
+
+    def _geometric_keys(self, start, end):
+        ## x_i = a * b^i, from the start key to the end key
+        a = start
+        b = np.exp((np.log(end) - np.log(start)) / max(self.number_of_samples - 1, 1))
+        return list(dict.fromkeys(int(np.floor(a * b**i)) for i in range(self.number_of_samples)))
+
+    def keys(self):
+        if self.grid:
+            return [
+                (n, m)
+                for n in self._geometric_keys(self.minimum_array_length, self.maximum_array_length)
+                for m in self._geometric_keys(self.minimum_different_numbers, self.maximum_different_numbers)
+            ]
+        return self._geometric_keys(self.array_start_key, self.array_end_key)
+
+    def creation_arguments(self, variability_number):
+        return self.settings["CREATION_ARRAY_ARGUMENTS"](variability_number).set_repetitions(self.number_of_repetitions).set_data_type(self.data_type).set_seeding(self.seeding).set_distribution(self.distribution, self.distribution_parameter).set_offset(self.offset)
+
+    def variability_key_number(self, key):
+        return VARIABILITY_KEY_NUMBER(key, self.maximum_different_numbers)
+
+    def creation_seed(self, key, index, repetition):
+        return CREATION_DETERMINISTIC_SEED(self.variability_key_number(key), index, repetition, self.number_of_repetitions)
+
+    def get_array_storage_folder_path(self, folder_name= None, get_all= False):
+        return GET_ARRAY_STORAGE_FOLDER_PATH(folder_name, get_all, main_storage_folder= self.main_array_storage_folder_path)
+
+    def get_array_chunk_files(self, storage_folders= None, get_all= False):
+        return GET_ARRAY_CHUNK_FILES_IN_STORAGE_FOLDER(storage_folders, get_all, main_storage_folder= self.main_array_storage_folder_path)
+
+    def get_compressed_array_files(self, storage_folders= None, get_all= False):
+        return GET_COMPRESSED_ARRAY_FILES_IN_STORAGE_FOLDER(storage_folders, get_all, main_storage_folder= self.main_array_storage_folder_path)
+
+    def get_generation_files(self, storage_folders= None, get_all= False):
+        return GET_GENERATION_FILES_IN_STORAGE_FOLDER(storage_folders, get_all, main_storage_folder= self.main_array_storage_folder_path)
+
+    def create_array_storage_folder(self):
+        return CREATE_ARRAY_STORAGE_FOLDER(main_storage_folder= self.main_array_storage_folder_path)
+
+    def apply_recursion_limit(self):
+        if sys.getrecursionlimit() < self.recursion_limit:
+            sys.setrecursionlimit(self.recursion_limit)
+
+    def __str__(self):
+        return f"VariabilityProfile({self.code}: {self.nice_name}, keys {self.array_start_key}..{self.array_end_key}, samples={self.number_of_samples}, rep={self.number_of_repetitions}, dtype={np.dtype(self.data_type).name}, distribution={self.distribution or 'uniform'})"
+
+
+## profile of the module constants, used when no profile is passed explicitly
+DEFAULT_PROFILE = VariabilityProfile(VARIABILITY)
 
 ## class containing current settings, this class is used when static keywords are not allowed
 class ArraySettings:
@@ -1,25 +1,290 @@
-import zpaq
+import os
+import io
 import pickle
 import json
+import time
+import threading
+import contextlib
+import struct
+import importlib
+import importlib.util
+import numpy as np
 
 COMPRESS_EXTENSION = ".zpaq"
 PICKABLE_EXTENSION = ".pick"
-ARRAY_ADMISSIBLE_EXTENSIONS = [COMPRESS_EXTENSION, PICKABLE_EXTENSION]
+## memory mapped storage: json index file + one raw buffer file per dtype (see ArrayDataManager.write_memory_mapped_storage)
+MEMORY_MAP_EXTENSION = ".mmap"
+RAW_EXTENSION = ".raw"
 JSON_EXTENSION = ".json"
 
-def action(compress=False, decompress=False, dump=False, load=False):
+## codec used when compression is requested without choosing one
+DEFAULT_CODEC = COMPRESS_EXTENSION
+DEFAULT_LEVEL = "default"
+
+## compressed files written by this module start with FRAME_MAGIC, followed by the length of a json header
+## {"codec", "buffers": [[bytes, itemsize], ...]} and by the compressed payload: the pickle stream and its NumPy
+## buffers (out-of-band, pickle protocol 5) byte shuffled by itemsize. Files without FRAME_MAGIC are plain zpaq.
+FRAME_MAGIC = b"ASCF"
+FRAME_HEADER_LENGTH = struct.Struct("<I")
+
+## streamed frames (header with "block_size"): the payload is a sequence of independently compressed blocks,
+## each one preceded by its compressed length, closed by a zero length
+STREAM_BLOCK_SIZE = 16 * 1024**2
+BLOCK_LENGTH = struct.Struct("<I")
+
+
+class Codec:
+    """
+    Compression codec registered by file extension. `levels` maps the presets ('fast', 'default', 'max')
+    on the levels of the underlying module, which is imported only when the codec is used
+    (optional dependencies are required only by who reads or writes their files).
+    """
+
+    def __init__(self, extension, module, compress, decompress, levels):
+        self.extension = extension
+        self.module = module
+        self._compress = compress
+        self._decompress = decompress
+        self.levels = levels
+
+    def _import(self):
+        try:
+            return importlib.import_module(self.module)
+        except ImportError:
+            raise ImportError(f"Codec '{self.extension}' needs the '{self.module}' module, install it to read or write these files.")
+
+    def is_available(self):
+        try:
+            return importlib.util.find_spec(self.module) is not None
+        except ImportError:
+            # parent package of a submodule (e.g. lz4.frame) not installed
+            return False
+
+    def get_level(self, level= None):
+        level = DEFAULT_LEVEL if level is None else level
+        return self.levels[level] if level in self.levels else level
+
+    def compress(self, data, level= None):
+        return self._compress(self._import(), data, self.get_level(level))
+
+    def decompress(self, data):
+        return self._decompress(self._import(), data)
+
+
+CODECS = {}
+
+## extensions of the array storage files, in order of preference when a chunk exists in more formats
+ARRAY_ADMISSIBLE_EXTENSIONS = [MEMORY_MAP_EXTENSION, PICKABLE_EXTENSION]
+
+
+def register_codec(extension, module, compress, decompress, levels):
+    CODECS[extension] = Codec(extension, module, compress, decompress, levels)
+    if extension not in ARRAY_ADMISSIBLE_EXTENSIONS:
+        ARRAY_ADMISSIBLE_EXTENSIONS.insert(ARRAY_ADMISSIBLE_EXTENSIONS.index(PICKABLE_EXTENSION), extension)
+
+
+def get_codec(extension= None):
+    if isinstance(extension, Codec):
+        return extension
+    extension = extension or DEFAULT_CODEC
+    if not extension.startswith("."):
+        extension = "." + extension
+    if extension not in CODECS:
+        raise ValueError(f"Unknown codec '{extension}', available codecs: {list(CODECS.keys())}")
+    return CODECS[extension]
+
+
+def get_codec_by_path(path):
+    for extension in CODECS:
+        if path.endswith(extension):
+            return CODECS[extension]
+    return None
+
+
+## zpaq has no compression level
+register_codec(COMPRESS_EXTENSION, "zpaq",
+    lambda zpaq, data, level: zpaq.compress(bytes(data)),
+    lambda zpaq, data: zpaq.decompress(bytes(data)),
+    {"fast": None, "default": None, "max": None})
+register_codec(".zst", "zstandard",
+    lambda zstd, data, level: zstd.ZstdCompressor(level= level).compress(data),
+    lambda zstd, data: zstd.ZstdDecompressor().decompress(data),
+    {"fast": 1, "default": 3, "max": 19})
+register_codec(".lz4", "lz4.frame",
+    lambda lz4, data, level: lz4.compress(data, compression_level= level),
+    lambda lz4, data: lz4.decompress(data),
+    {"fast": 0, "default": 3, "max": 12})
+register_codec(".xz", "lzma",
+    lambda lzma, data, level: lzma.compress(data, preset= level),
+    lambda lzma, data: lzma.decompress(data),
+    {"fast": 0, "default": 6, "max": 9})
+register_codec(".gz", "zlib",
+    lambda zlib, data, level: zlib.compress(data, level),
+    lambda zlib, data: zlib.decompress(data),
+    {"fast": 1, "default": 6, "max": 9})
+register_codec(".bz2", "bz2",
+    lambda bz2, data, level: bz2.compress(data, level),
+    lambda bz2, data: bz2.decompress(data),
+    {"fast": 1, "default": 9, "max": 9})
+
+
+def shuffle_bytes(buffer, itemsize):
+    # byte k of every item is stored contiguously: bytes with the same significance compress better
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if itemsize <= 1 or len(data) % itemsize:
+        return data
+    return data.reshape(-1, itemsize).T.ravel()
+
+
+def unshuffle_bytes(buffer, itemsize):
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if itemsize <= 1 or len(data) % itemsize:
+        return data.copy()
+    return data.reshape(itemsize, -1).T.ravel()
+
+
+def compress_frame(data, codec= None, level= None, dump= True, shuffle= True):
+    codec = get_codec(codec)
+    buffers = []
+    if dump:
+        data = pickle.dumps(data, 5, buffer_callback= buffers.append if shuffle else None)
+    else:
+        data = bytes(data)
+
+    header = {"codec": codec.extension, "buffers": []}
+    payload = [data]
+    for buffer in buffers:
+        raw = buffer.raw()
+        itemsize = memoryview(buffer).itemsize
+        header["buffers"].append([raw.nbytes, itemsize])
+        payload.append(shuffle_bytes(raw, itemsize))
+
+    header = json.dumps(header).encode("utf-8")
+    return FRAME_MAGIC + FRAME_HEADER_LENGTH.pack(len(header)) + header + codec.compress(b"".join(payload), level)
+
+
+def decompress_frame(raw, load= True):
+    if not raw.startswith(FRAME_MAGIC):
+        # files written before the codec registry
+        data = CODECS[COMPRESS_EXTENSION].decompress(raw)
+        return pickle.loads(data) if load else data
+
+    header_start = len(FRAME_MAGIC) + FRAME_HEADER_LENGTH.size
+    header_length, = FRAME_HEADER_LENGTH.unpack(raw[len(FRAME_MAGIC):header_start])
+    header = json.loads(raw[header_start:header_start + header_length].decode("utf-8"))
+    if "block_size" in header:
+        payload = b"".join(iterate_frame_blocks(io.BytesIO(raw[header_start + header_length:]), get_codec(header["codec"])))
+    else:
+        payload = get_codec(header["codec"]).decompress(raw[header_start + header_length:])
+
+    buffers_length = sum(length for length, _ in header["buffers"])
+    data = payload[:len(payload) - buffers_length]
+    buffers = []
+    offset = len(data)
+    for length, itemsize in header["buffers"]:
+        buffers.append(unshuffle_bytes(payload[offset:offset + length], itemsize))
+        offset += length
+
+    if load:
+        return pickle.loads(data, buffers= buffers)
+    if buffers:
+        # the pickle stream is returned with its buffers in band
+        return pickle.dumps(pickle.loads(data, buffers= buffers), pickle.HIGHEST_PROTOCOL)
+    return data
+
+
+def read_frame_header(file):
+    """
+    Reads the header of the frame at the current position of `file`, returns None (and rewinds) if there is no frame.
+    """
+    start = file.tell()
+    magic = file.read(len(FRAME_MAGIC))
+    if magic != FRAME_MAGIC:
+        file.seek(start)
+        return None
+    header_length, = FRAME_HEADER_LENGTH.unpack(file.read(FRAME_HEADER_LENGTH.size))
+    return json.loads(file.read(header_length).decode("utf-8"))
+
+
+def iterate_frame_blocks(file, codec):
+    while True:
+        block_length, = BLOCK_LENGTH.unpack(file.read(BLOCK_LENGTH.size))
+        if block_length == 0:
+            return
+        yield codec.decompress(file.read(block_length))
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode= "wb"):
+    """
+    Opens a temporary file next to `path` that replaces it only once closed without errors,
+    so that an interrupted write never leaves a truncated file.
+    """
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary_path, mode) as file:
+            yield file
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def compress_file(source_path, destination_path= None, codec= None, level= None, block_size= STREAM_BLOCK_SIZE):
+    """
+    Compresses the bytes of a file block by block (streamed frame), without reading it entirely in memory.
+    The destination (the source itself by default) is replaced atomically. Returns (read bytes, written bytes).
+    """
+    codec = get_codec(codec)
+    destination_path = destination_path or source_path
+    header = json.dumps({"codec": codec.extension, "buffers": [], "block_size": block_size}).encode("utf-8")
+
+    read_bytes = 0
+    # the source is closed before being replaced (the destination can be the source itself)
+    with atomic_open(destination_path) as destination, open(source_path, "rb") as source:
+        destination.write(FRAME_MAGIC + FRAME_HEADER_LENGTH.pack(len(header)) + header)
+        while block := source.read(block_size):
+            read_bytes += len(block)
+            compressed = codec.compress(block, level)
+            destination.write(BLOCK_LENGTH.pack(len(compressed)) + compressed)
+        destination.write(BLOCK_LENGTH.pack(0))
+        written_bytes = destination.tell()
+    return read_bytes, written_bytes
+
+
+def decompress_file(source_path, destination_path= None):
+    """
+    Decompresses a file written by compress_file block by block, other compressed files (single payload frames,
+    plain zpaq) are decompressed at once. The destination (the source itself by default) is replaced atomically.
+    Returns (read bytes, written bytes).
+    """
+    destination_path = destination_path or source_path
+
+    with atomic_open(destination_path) as destination, open(source_path, "rb") as source:
+        header = read_frame_header(source)
+        if header is not None and "block_size" in header:
+            for block in iterate_frame_blocks(source, get_codec(header["codec"])):
+                destination.write(block)
+        else:
+            source.seek(0)
+            destination.write(decompress_frame(source.read(), load= False))
+        read_bytes, written_bytes = source.tell(), destination.tell()
+    return read_bytes, written_bytes
+
+
+def action(compress=False, decompress=False, dump=False, load=False, codec=None, level=None, shuffle=True):
     if compress and decompress:
         raise ValueError("You cannot use compression and decompression at the same time.")
     if dump and load:
         raise ValueError("You cannot use dump and load at the same time.")
 
     def composed(x):
-        if dump:
-            x = pickle.dumps(x, pickle.HIGHEST_PROTOCOL)
         if compress:
-            x = zpaq.compress(x)
+            return compress_frame(x, codec, level, dump= dump, shuffle= shuffle)
         if decompress:
-            x = zpaq.decompress(x)
+            return decompress_frame(x, load= load)
+        if dump:
+            x = pickle.dumps(x, pickle.HIGHEST_PROTOCOL)
         if load:
             x = pickle.loads(x)
         return x
@@ -27,32 +292,35 @@ def action(compress=False, decompress=False, dump=False, load=False):
     return composed
 
 
-def writeOnFile(data, path, return_file_path= False, compress= False, dump= True, as_json=False):
+def writeOnFile(data, path, return_file_path= False, compress= False, dump= True, as_json=False, codec= None, level= None, shuffle= True):
 
     if as_json:
         data = json.dumps(data, indent= 4).encode('utf-8')
-        
-        
+
+
     else:
+        if compress and codec is None:
+            codec = get_codec_by_path(path)
         ## delete action function
-        data = action(compress= compress, dump= dump)(data)
-            
+        data = action(compress= compress, dump= dump, codec= codec, level= level, shuffle= shuffle)(data)
+
     if '.' not in path:
         if as_json:
             path += JSON_EXTENSION
+        elif compress:
+            path += get_codec(codec).extension
         elif dump:
             path += PICKABLE_EXTENSION
-        elif compress:
-            path += COMPRESS_EXTENSION
-            
-            
-    with open(path, "wb") as file:
+
+
+    # an interrupted write never leaves a truncated file
+    with atomic_open(path) as file:
         file.write(data)
-        
+
     return path if return_file_path else None
-    
+
 def readFromFile(path, return_file_name= False, decompress= False, load= True, as_json=False):
-        
+
     with open(path, "rb") as file:
         raw = file.read()
 
@@ -62,5 +330,60 @@ def readFromFile(path, return_file_name= False, decompress= False, load= True, a
         data = action(decompress=decompress, load=load)(raw)
 
     return (data, path) if return_file_name else data
-        
 
+
+def benchmark_codecs(data, codecs= None, levels= None, shuffle_options= (True, False)):
+    """
+    Compresses and decompresses `data` with every available codec, level preset and shuffle option.
+    Returns one dict per combination with the compression ratio and the compression/decompression speed
+    in MB/s of the uncompressed pickle stream.
+    """
+    codecs = [get_codec(codec) for codec in codecs] if codecs else [codec for codec in CODECS.values() if codec.is_available()]
+    levels = levels or list(CODECS[DEFAULT_CODEC].levels.keys())
+    uncompressed_bytes = len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+    results = []
+    for codec in codecs:
+        # presets mapped on the same level are measured once
+        for level in dict.fromkeys(levels, None):
+            if any(codec.get_level(other) == codec.get_level(level) for other in levels[:levels.index(level)]):
+                continue
+            for shuffle in shuffle_options:
+                start = time.perf_counter()
+                compressed = compress_frame(data, codec.extension, level, shuffle= shuffle)
+                compression_time = time.perf_counter() - start
+                start = time.perf_counter()
+                decompress_frame(compressed)
+                decompression_time = time.perf_counter() - start
+                results.append({
+                    "codec": codec.extension,
+                    "level": level,
+                    "shuffle": shuffle,
+                    "ratio": uncompressed_bytes / len(compressed),
+                    "compress_MBps": uncompressed_bytes / 1024**2 / compression_time,
+                    "decompress_MBps": uncompressed_bytes / 1024**2 / decompression_time
+                })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    from Utils import ArraySettings, ArrayDataManager
+    parser = argparse.ArgumentParser("Benchmark of the compression codecs on the array storage folders")
+    parser.add_argument("-s", "--storage", help="Names of the storage folders (the most recent one if not specified).", type=str, nargs="*", default= None)
+    parser.add_argument("-c", "--codecs", help=f"Codecs to be measured (all the installed ones if not specified): {list(CODECS.keys())}.", type=str, nargs="*", default= None)
+    parser.add_argument("-l", "--levels", help="Level presets to be measured.", type=str, nargs="*", default= None)
+    args = parser.parse_args()
+
+    for folder_path, chunk_files in ArraySettings.GET_ARRAY_CHUNK_FILES_IN_STORAGE_FOLDER(args.storage).items():
+        for chunk_file in chunk_files:
+            array_sample_container = ArrayDataManager.read_array_storage_file(chunk_file)
+            # memory mapped and virtual samples are measured on their arrays
+            data = ArrayDataManager.ArraySampleContainer({
+                key: ArrayDataManager.ArraySample([np.asarray(array) for array in array_sample.get_sample()], array_sample.get_creation_arguments(), key)
+                for key, array_sample in array_sample_container.items()
+            })
+            print(f"{chunk_file}:")
+            print(f"  {'codec':<6} {'level':<8} {'shuffle':<8} {'ratio':>8} {'comp MB/s':>10} {'decomp MB/s':>12}")
+            for result in benchmark_codecs(data, args.codecs, args.levels):
+                print(f"  {result['codec']:<6} {result['level']:<8} {str(result['shuffle']):<8} {result['ratio']:>8.2f} {result['compress_MBps']:>10.1f} {result['decompress_MBps']:>12.1f}")
@@ -6,8 +6,32 @@ EXECUTION_TIMES_FOLDER = os.sep.join(["Benchmark", "ExecutionTimes", f"{VARIABIL
 EXECUTION_TIMES_GRAPH_FOLDER = os.sep.join(["Report", "Charts", f"{VARIABILITY.value['code']}_variability"])
 EXECUTION_TIMES_FILE_EXTENSION = ".time"
 
+## format of the execution times files written by the benchmark runs:
+##   "pickle"   -> '<Algorithm>.time' pickled ExecutionTimeDataStorage (read by the notebooks and the graph viewer)
+##   "columnar" -> '<Algorithm>.npz' ArrayDataManager.ColumnarExecutionTimeStorage, without pickle (execution times only)
+EXECUTION_TIMES_PICKLE_FORMAT = "pickle"
+EXECUTION_TIMES_COLUMNAR_FORMAT = "columnar"
+EXECUTION_TIMES_FORMATS = [EXECUTION_TIMES_PICKLE_FORMAT, EXECUTION_TIMES_COLUMNAR_FORMAT]
+EXECUTION_TIMES_FORMAT = EXECUTION_TIMES_PICKLE_FORMAT
+
 RELATIVE_TIME_ERROR = 0.001
 
+## fresh-input measurement: number of preallocated copies of the array and upper bound of the whole pool in bytes
+FRESH_INPUT_POOL_SIZE = 32
+FRESH_INPUT_POOL_MAX_BYTES = 64 * 1024**2
+
+## adaptive measurement: repetitions of a key are measured until the 95% confidence interval half-width
+## relative to the mean is below the target, within the minimum and maximum number of repetitions
+ADAPTIVE_TARGET_RELATIVE_CI = 0.02
+ADAPTIVE_MIN_REPETITIONS = 3
+ADAPTIVE_MAX_REPETITIONS = 30
+
+## base (power of two) of the digits used by RadixSortVectorized
+RADIX_SORT_VECTORIZED_BASE = 256
+
+## algorithms measured by Benchmark/run.py when none is selected
+DEFAULT_BENCHMARK_ALGORITHMS = ["CountingSort", "QuickSort", "RadixSort", "QuickSort3Way"]
+
 def clock_resolution():
     """
     Compute system clock resolution
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import platform
+import numpy as np
+
+from Utils import SortingSettings
+from Utils import ArrayStorageCompressor
+
+## project root (parent of the Utils folder), the profile is found from any working directory (e.g. the notebooks in Benchmark)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+## per-host calibration profile, stored next to the execution times folders
+CALIBRATION_FILE_PATH = os.sep.join([PROJECT_ROOT, "Benchmark", "ExecutionTimes", "calibration.json"])
+
+# calibration profile already loaded by the current process
+_loaded_calibration = {}
+
+
+def host_fingerprint():
+    """
+    Identifies the host and the interpreter: a calibration profile is valid only for the same fingerprint.
+    """
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": sys.version,
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__
+    }
+
+
+def get_loop_overhead(minTime):
+    """
+    Compute the mean cost of one iteration of the measurement loop (see SortingMeasurement.measure) on an empty function
+    """
+    function, args = (lambda: None), ()
+    count = 0
+    start_time = time.perf_counter()
+    while True:
+        function(*args)
+        end_time = time.perf_counter()
+        count += 1
+        if end_time - start_time >= minTime:
+            break
+    return (end_time - start_time) / count
+
+
+def calibrate(iterations=500):
+    """
+    Computes the calibration profile of the current host.
+    """
+    clock_resolution = SortingSettings.get_time_resolution(iterations)
+    min_time = clock_resolution*(1/SortingSettings.RELATIVE_TIME_ERROR + 1)
+    return {
+        "fingerprint": host_fingerprint(),
+        "relative_time_error": SortingSettings.RELATIVE_TIME_ERROR,
+        "clock_resolution": clock_resolution,
+        "loop_overhead": get_loop_overhead(min_time),
+        "min_time": min_time
+    }
+
+
+def load_calibration(path=CALIBRATION_FILE_PATH, recalibrate=False):
+    """
+    Returns the calibration profile of the current host. The profile saved at `path` is reused unless it belongs
+    to a different host/interpreter or to a different RELATIVE_TIME_ERROR, otherwise it is computed and saved again.
+    """
+
+    if not recalibrate and path in _loaded_calibration:
+        return _loaded_calibration[path]
+
+    calibration = None
+    if not recalibrate and os.path.isfile(path):
+        calibration = ArrayStorageCompressor.readFromFile(path, as_json=True)
+        if calibration.get("fingerprint") != host_fingerprint() or calibration.get("relative_time_error") != SortingSettings.RELATIVE_TIME_ERROR:
+            print(f"Calibration profile at {path} belongs to a different host or settings, recalibrating.")
+            calibration = None
+
+    if calibration is None:
+        calibration = calibrate()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        ArrayStorageCompressor.writeOnFile(calibration, path, as_json=True)
+
+    _loaded_calibration[path] = calibration
+    return calibration
+
+
+def get_min_time(path=CALIBRATION_FILE_PATH):
+    """
+    Minimum measurable time based on RELATIVE_TIME_ERROR, taken from the calibration profile
+    (cached counterpart of SortingSettings.compute_min_time)
+    """
+    return load_calibration(path)["min_time"]
+
+
+def get_loop_overhead_correction(path=CALIBRATION_FILE_PATH):
+    """
+    Cost of one iteration of the measurement loop without the measured function, taken from the calibration profile:
+    it is subtracted from every average computed by SortingMeasurement.measure
+    """
+    return load_calibration(path)["loop_overhead"]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser("Timer calibration profile")
+    parser.add_argument("-f", "--file", help="Calibration profile path.", type=str, default=CALIBRATION_FILE_PATH)
+    parser.add_argument("-r", "--recalibrate", help="Computes the profile again even if a valid one exists.", action='store_true')
+    args = parser.parse_args()
+
+    calibration = load_calibration(args.file, recalibrate=args.recalibrate)
+    print(f"Calibration profile at: {os.path.abspath(args.file)}")
+    for key, value in calibration.items():
+        if key != "fingerprint":
+            print(f"  {key}: {value}")
@@ -1,5 +1,6 @@
 import ArrayStorageCompressor as asc
-import argparse, sys
+import argparse, sys, os, time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 def increment(string, reverse= False):
     try:
@@ -50,6 +51,14 @@ def get_files_from_path_format(format_string, files_number):
         files.append(processed_string)
     return files
 
+def process_file(file, compress= True, codec= None, level= None):
+    start = time.perf_counter()
+    if compress:
+        read_bytes, written_bytes = asc.compress_file(file, codec= codec, level= level)
+    else:
+        read_bytes, written_bytes = asc.decompress_file(file)
+    return file, read_bytes, written_bytes, time.perf_counter() - start
+
 if __name__ == "__main__":
     decault_action = "--compress"
     parser = argparse.ArgumentParser("Compress/Decompress file")
@@ -57,6 +66,10 @@ if __name__ == "__main__":
     parser.add_argument("-c", "--compress", help="Flag to compress.", action='store_true')
     parser.add_argument("-dec", "--decompress", help="Flag to decompress.", action='store_true')
     parser.add_argument("-r", "--range", help="Range of files with same pattern name.", type= int, default=1)
+    parser.add_argument("-j", "--jobs", help="Number of files processed concurrently.", type= int, default=1)
+    parser.add_argument("-p", "--processes", help="Uses a pool of processes instead of threads (with --jobs).", action='store_true')
+    parser.add_argument("--codec", help=f"Compression codec: {list(asc.CODECS.keys())}.", type= str, default= asc.DEFAULT_CODEC)
+    parser.add_argument("--level", help="Compression level preset (fast, default, max).", type= str, default= asc.DEFAULT_LEVEL)
     args = parser.parse_args()
     if len(sys.argv)==1:
         parser.print_help(sys.stderr)
@@ -75,10 +88,17 @@ if __name__ == "__main__":
             args = parser.parse_args(current_args)
         else:
             sys.exit(1)
-    for file in get_files_from_path_format(args.file, args.range):
-        print(f"Working on: {file}")
-        data = asc.readFromFile(file, decompress= args.decompress, load= False)
-        asc.writeOnFile(data, file, compress= args.compress, dump= False)
-    print("Done.")
+    files = get_files_from_path_format(args.file, args.range)
+    pool = ProcessPoolExecutor if args.processes else ThreadPoolExecutor
+    start = time.perf_counter()
+    total_read_bytes = 0
+    with pool(max_workers= max(args.jobs, 1)) as executor:
+        for file in files:
+            print(f"Working on: {file}")
+        for file, read_bytes, written_bytes, elapsed in executor.map(process_file, files, [args.compress]*len(files), [args.codec]*len(files), [args.level]*len(files)):
+            total_read_bytes += read_bytes
+            print(f"{file}: {read_bytes / 1024**2:.1f} MB -> {written_bytes / 1024**2:.1f} MB in {elapsed:.2f} s ({read_bytes / 1024**2 / max(elapsed, 1e-9):.1f} MB/s)")
+    elapsed = time.perf_counter() - start
+    print(f"Done: {len(files)} file(s), {total_read_bytes / 1024**2:.1f} MB in {elapsed:.2f} s ({total_read_bytes / 1024**2 / max(elapsed, 1e-9):.1f} MB/s).")
     
     
@@ -8,6 +8,9 @@ from Utils.ArraySettings import Variability
 from Utils import ArrayStorageCompressor
 import glob
 
+## charts combined by combine(): figures without a "chart" entry in layout.meta are time charts
+TIME_CHART = "time"
+
 
 def combine(figures):
     from collections import defaultdict
@@ -22,17 +25,17 @@ def combine(figures):
         "logaritmic": lambda x: f"(log({x}))" if x else '(log)'
     }
 
-    # Metadata extraction
-    variabilities, scales = set(), set()
+    # Metadata extraction (custom variability profiles follow the default ones)
+    variabilities, scales = [], set()
     for fig in figures:
         v = fig["layout"]["meta"]["variability"]
         s = fig["layout"]["meta"]["scale"]
-        assert v in default_variability_order, f"Unknown variability {v}"
         assert s in default_scales_order, f"Unknown scale {s}"
-        variabilities.add(v)
+        if v not in variabilities:
+            variabilities.append(v)
         scales.add(s)
 
-    variabilities = [v for v in default_variability_order if v in variabilities]
+    variabilities = [v for v in default_variability_order if v in variabilities] + [v for v in variabilities if v not in default_variability_order]
     scales = [s for s in default_scales_order if s in scales]
     assert variabilities, f"No valid variabilities. Expected: {default_variability_order}"
     assert len(variabilities) <= 2, (
@@ -170,19 +173,36 @@ def combine(figures):
     return fig
 
 
+def split_by_chart(figures):
+    charts = {}
+    for fig in figures:
+        meta = fig["layout"]["meta"] or {}
+        charts.setdefault(meta.get("chart", TIME_CHART), []).append(fig)
+    return charts
+
+
 def show_figures(figures):
-    if len(figures) > 1:
-        combine(figures).show()
-    else:
-        figures.pop().show()
+    for chart, chart_figures in split_by_chart(figures).items():
+        if chart == TIME_CHART and len(chart_figures) > 1:
+            combine(chart_figures).show()
+        else:
+            for fig in chart_figures:
+                fig.show()
 
 def write_figures(figures, output, width=1500, height=900, scale=4):
-    if len(figures) > 1:
-        fig = combine(figures)
-    else:
-        fig = figures.pop()
     if '.' not in output:
         output += ".html"
+    root, extension = os.path.splitext(output)
+    for chart, chart_figures in split_by_chart(figures).items():
+        if chart == TIME_CHART and len(chart_figures) > 1:
+            chart_figures = [combine(chart_figures)]
+        for i, fig in enumerate(chart_figures):
+            # time charts keep the requested output name, the other charts are written next to it
+            suffix = "" if chart == TIME_CHART else f"_{chart}"
+            suffix += f"_{i}" if len(chart_figures) > 1 else ""
+            write_figure(fig, root + suffix + extension, width, height, scale)
+
+def write_figure(fig, output, width=1500, height=900, scale=4):
     if output.endswith(".html"):
         html_str = fig.to_html(include_plotlyjs='cdn', full_html=True, config={"responsive": True})
         #if figures:
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+from Utils.ArrayDataManager import ArraySampleCreationArguments, ArrayExecutionTime, ExecutionTimeDataStorage, ColumnarExecutionTimeStorage
+
+
+CREATION_ARGUMENTS = ArraySampleCreationArguments(n=100, m=10, rep=2, seeds=[1, 2], dtype="uint8")
+
+
+def fresh_input_run(times):
+    return ArrayExecutionTime(times, CREATION_ARGUMENTS, 100, raw_execution_times=[time * 2 for time in times])
+
+
+def normal_run(times):
+    return ArrayExecutionTime(times, CREATION_ARGUMENTS, 100)
+
+
+class TestMixedRawExecutionTimes(unittest.TestCase):
+
+    def assert_aligned(self, execution_time):
+        raw_execution_times = execution_time.get_raw_execution_times()
+        self.assertEqual(len(raw_execution_times), len(execution_time.get_sample()))
+        for execution_chunk, raw_chunk in zip(execution_time.get_sample(), raw_execution_times):
+            self.assertEqual(len(raw_chunk), len(execution_chunk))
+
+    def test_fresh_input_extended_with_normal_run(self):
+        execution_time = fresh_input_run([0.1, 0.2])
+        execution_time.extend(normal_run([0.3, 0.4]))
+
+        self.assert_aligned(execution_time)
+        self.assertEqual(execution_time.get_raw_execution_times()[0], [0.2, 0.4])
+        self.assertTrue(np.isnan(execution_time.get_raw_execution_times()[1]).all())
+
+    def test_normal_run_extended_with_fresh_input(self):
+        execution_time = normal_run([0.1, 0.2])
+        execution_time.extend(fresh_input_run([0.3, 0.4]))
+
+        self.assert_aligned(execution_time)
+        self.assertTrue(np.isnan(execution_time.get_raw_execution_times()[0]).all())
+        self.assertEqual(execution_time.get_raw_execution_times()[1], [0.6, 0.8])
+
+    def test_mixed_runs_converted_to_columnar(self):
+        storage = ExecutionTimeDataStorage()
+        storage.update("Algorithm", "folder", [fresh_input_run([0.1, 0.2])])
+        storage.merge({"Algorithm": {"folder": [normal_run([0.3, 0.4])]}})
+        storage.merge({"Algorithm": {"folder": [fresh_input_run([0.5, 0.6])]}})
+
+        columnar = ColumnarExecutionTimeStorage()
+        columnar.merge(storage)
+        self.assertEqual(len(columnar.rows), 6)
+        np.testing.assert_array_equal(columnar.rows["seconds"], [0.1, 0.2, 0.3, 0.4, 0.5, 0.6])
+        np.testing.assert_array_equal(columnar.rows["raw_seconds"], [0.2, 0.4, np.nan, np.nan, 1.0, 1.2])
+
+        execution_time, = columnar.get_execution_times("Algorithm", "folder")
+        self.assertEqual(execution_time.get_sample(), [[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]])
+        self.assert_aligned(execution_time)
+
+
+if __name__ == "__main__":
+    unittest.main()